@@ -0,0 +1,296 @@
+# === Unified Video Processing API ===
+#
+# One FastAPI application for every deployment. The pipeline profile (PIPELINE_PROFILE,
+# see pipeline.py) decides where recordings and documents go, the document format and
+# whether captions and web context are produced; every route below runs on the same
+# pipeline core and worker pool. Applications are built by the entry modules: main.py
+# (smb profile by default) and app.py (azure profile, for existing `uvicorn app:app`
+# deployments), so importing this module builds nothing.
+
+import os
+import shutil
+from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+from typing import Optional
+import logging
+from fastapi.responses import HTMLResponse
+from fastapi import Form
+from fastapi.concurrency import run_in_threadpool
+import metrics
+import scratch
+import resumable_upload
+import batch_ingest
+import live_transcription
+import startup
+import pipeline
+
+# === Setup Logging ===
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+pyodbc = startup.lazy_import("pyodbc")
+
+# === SQL Server Setup ===
+SQL_CONN_STR = (
+    "Driver={ODBC Driver 17 for SQL Server};"
+    "Server=183.82.108.211;"
+    "Database=SampleDB;"
+    "UID=Connectly;"
+    "PWD=LT@connect25;"
+)
+
+# === Pydantic Models ===
+class VideoProcessRequest(BaseModel):
+    meeting_id: str
+    user_id: str
+
+# === Database Initialization ===
+def initialize_sql():
+    try:
+        conn = pyodbc.connect(SQL_CONN_STR)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'tbl_Users')
+        CREATE TABLE tbl_Users (
+            ID INT IDENTITY(1,1) PRIMARY KEY,
+            full_name NVARCHAR(100) NOT NULL,
+            email NVARCHAR(100) NOT NULL,
+            password NVARCHAR(255) NOT NULL,
+            phone_number NVARCHAR(20),
+            address NVARCHAR(255),
+            country NVARCHAR(50),
+            Status BIT DEFAULT 1,
+            status_Code CHAR(1) DEFAULT 'u',
+            country_code NVARCHAR(10),
+            languages NVARCHAR(100),
+            agreeToTerms BIT DEFAULT 0,
+            Created_At DATETIME DEFAULT GETDATE(),
+            Updated_At DATETIME NULL
+        )""")
+
+        cursor.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'tbl_Meetings')
+        CREATE TABLE tbl_Meetings (
+            ID UNIQUEIDENTIFIER PRIMARY KEY DEFAULT NEWID(),
+            Host_ID INT,
+            Meeting_Name NVARCHAR(200),
+            Meeting_Type NVARCHAR(50) CHECK (Meeting_Type IN ('CalendarMeeting', 'ScheduleMeeting', 'InstantMeeting')),
+            Meeting_Link NVARCHAR(500),
+            Status NVARCHAR(50) CHECK (Status IN ('active', 'ended', 'scheduled')) DEFAULT 'active',
+            Created_At DATETIME DEFAULT GETDATE(),
+            Started_At DATETIME,
+            Ended_At DATETIME,
+            Is_Recording_Enabled BIT DEFAULT 0,
+            Waiting_Room_Enabled BIT DEFAULT 0,
+            CONSTRAINT FK_Meetings_Users FOREIGN KEY (Host_ID)
+                REFERENCES tbl_Users(ID)
+                ON DELETE NO ACTION
+                ON UPDATE NO ACTION
+        )""")
+
+        conn.commit()
+        conn.close()
+        logger.info("[SQL] Tables verified.")
+    except Exception as e:
+        logger.error(f"[ERROR] SQL Initialization failed: {e}")
+        raise HTTPException(status_code=500, detail=f"SQL Initialization failed: {str(e)}")
+
+
+# === Application ===
+def create_app(settings: pipeline.Settings, core: Optional[pipeline.Pipeline] = None) -> FastAPI:
+    core = core or pipeline.Pipeline(settings)
+    app = FastAPI(title="Video Processing API")
+    app.state.pipeline = core
+
+    # Runs in the background once the server is accepting requests; /health says "starting" until then
+    warmup = startup.Warmup()
+    warmup.add("storage", core.prepare_storage)
+    if settings.sql_schema:
+        warmup.add("sql_schema", initialize_sql)
+    # Only what this profile uses; the Azure SDK is never needed on the share, nor pyodbc without the SQL check
+    clients = core.clients() + ([pyodbc] if settings.sql_schema else [])
+    warmup.add("clients", lambda: startup.preload(clients))
+    app.state.warmup = warmup
+    app.state.clients = clients
+
+    @app.on_event("startup")
+    async def startup_event():
+        logger.info(f"[PIPELINE] Profile: {settings.as_dict()}")
+        warmup.start()
+
+    # Kept recordings land in the folder batch ingestion scans, so only video files are
+    # accepted there; discarded uploads may be anything ffmpeg can read, as app.py always took
+    allowed_extensions = pipeline.VIDEO_EXTENSIONS if settings.keep_recordings else None
+
+    def kept_path(filename: str) -> str:
+        return os.path.join(settings.video_dir, f"{os.path.splitext(os.path.basename(filename))[0]}.mp4")
+
+    def find_existing(filename: str, meeting_id: str, user_id: str) -> Optional[dict]:
+        existing = core.find_processed(kept_path(filename) if settings.keep_recordings else None, meeting_id, user_id)
+        return core.skipped_response(existing) if existing else None
+
+    def save_upload(file: UploadFile, video_path: str):
+        # Written under a temporary name, so a batch scan of the recordings folder never sees a partial file
+        partial_path = video_path + ".part"
+        try:
+            with open(partial_path, "wb") as buffer, metrics.stage("receive_upload"):
+                shutil.copyfileobj(file.file, buffer)
+            os.replace(partial_path, video_path)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        metrics.record_file_bytes("receive_upload", video_path)
+
+    async def receive_upload(file: UploadFile, meeting_id: str, user_id: str):
+        # Mongo, disk-space admission and the file copy all block, so none of them run on the event loop
+        try:
+            # Validate file type
+            if allowed_extensions and not file.filename.lower().endswith(allowed_extensions):
+                raise HTTPException(status_code=400, detail=f"Unsupported file format. Use {', '.join(allowed_extensions)}")
+
+            # Don't receive a recording that has already been processed
+            existing = await run_in_threadpool(find_existing, file.filename, meeting_id, user_id)
+            if existing:
+                return JSONResponse(content=existing)
+
+            upload_bytes = getattr(file, "size", None) or 0
+            # Reserve room for the upload itself plus its intermediates before writing anything
+            async with core.scratch_space.async_job(f"{meeting_id}_{user_id}", upload_bytes + scratch.estimate_job_bytes(upload_bytes)) as scratch_job:
+                if settings.keep_recordings:
+                    video_path = kept_path(file.filename)
+                else:
+                    # Not kept: the upload is a scratch intermediate of this job
+                    video_path = scratch_job.path(os.path.basename(file.filename))
+                await run_in_threadpool(save_upload, file, video_path)
+
+                result = await core.process_video(video_path, meeting_id, user_id)
+            return JSONResponse(content=result)
+        except scratch.InsufficientScratchSpace as e:
+            logger.error(f"[ERROR] Video upload refused: {e}")
+            raise HTTPException(status_code=507, detail=str(e))
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("[ERROR] Video upload failed")
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @app.post("/upload-video/")
+    async def upload_video(file: UploadFile = File(...), meeting_id: str = "", user_id: str = ""):
+        return await receive_upload(file, meeting_id, user_id)
+
+    @app.post("/upload/")
+    async def upload_video_form(
+        file: UploadFile = File(...),
+        meeting_id: str = Form(...),
+        user_id: str = Form(...)
+    ):
+        return await receive_upload(file, meeting_id, user_id)
+
+    app.include_router(resumable_upload.create_router(
+        settings.upload_staging_dir,
+        core.scratch_space,
+        core.process_video,
+        allowed_extensions=allowed_extensions,
+        destination=kept_path if settings.keep_recordings else None,
+        extract_args=settings.extract_args,
+        find_existing=find_existing,
+    ))
+
+    app.include_router(live_transcription.create_router(
+        settings.live_session_dir,
+        transcribe=core.transcribe_segment,
+        finalize=core.finalize_live_meeting,
+        submit=core.submit,
+    ))
+
+    @app.post("/batch/ingest")
+    def start_batch_ingest(
+        directory: str = Form(settings.video_dir),
+        parallelism: int = Form(settings.batch_workers),
+        recursive: bool = Form(False),
+        watch: bool = Form(False),
+        user_id: str = Form("batch")
+    ):
+        if not os.path.isdir(directory):
+            raise HTTPException(status_code=400, detail=f"Directory not found: {directory}")
+        if parallelism < 1:
+            raise HTTPException(status_code=400, detail="parallelism must be at least 1")
+        # More batch threads than batch workers would only queue inside the pool
+        parallelism = min(parallelism, settings.batch_workers)
+        batch = batch_ingest.BatchIngest(
+            directory,
+            core.process_batch_video,
+            core.collection,
+            parallelism=parallelism,
+            recursive=recursive,
+            watch=watch,
+            user_id=user_id,
+            is_active=core.is_active,
+            exclude_dirs=core.work_dirs,
+        ).start()
+        logger.info(f"[BATCH] Started {batch.batch_id} on {directory} (parallelism={parallelism})")
+        return {"batch_id": batch.batch_id, "status": "running", "parallelism": parallelism}
+
+    @app.get("/batch/{batch_id}")
+    def batch_status(batch_id: str):
+        batch = batch_ingest.get_batch(batch_id)
+        if not batch:
+            raise HTTPException(status_code=404, detail="Unknown batch")
+        return batch.report()
+
+    @app.delete("/batch/{batch_id}")
+    def stop_batch(batch_id: str):
+        batch = batch_ingest.get_batch(batch_id)
+        if not batch:
+            raise HTTPException(status_code=404, detail="Unknown batch")
+        batch.stop()
+        return {"batch_id": batch_id, "status": "stopping"}
+
+    @app.get("/health")
+    def health_check():
+        if not warmup.ready:
+            return JSONResponse(
+                content={"status": "starting", "queue_depth": metrics.queue_depth(),
+                         "jobs_in_flight": metrics.jobs_in_flight(), "startup": warmup.report()},
+                status_code=503,
+            )
+        checks = {
+            "mongo": metrics.probe(lambda: pipeline.mongo_client.admin.command("ping")),
+            core.storage.name: metrics.probe(core.storage.check),
+        }
+        free_bytes = []
+        checks["scratch"] = metrics.probe(lambda: free_bytes.append(core.scratch_space.free_bytes()))
+        if settings.sql_schema:
+            checks["sql_server"] = metrics.probe(lambda: pyodbc.connect(SQL_CONN_STR, timeout=5).close())
+        ready = all(check["ok"] for check in checks.values())
+        return JSONResponse(
+            content={
+                "status": "healthy" if ready else "unhealthy",
+                "profile": settings.profile,
+                "queue_depth": metrics.queue_depth(),
+                "jobs_in_flight": metrics.jobs_in_flight(),
+                "scratch_free_bytes": free_bytes[0] if free_bytes else None,
+                "dependencies": checks,
+                "startup": warmup.report(),
+            },
+            status_code=200 if ready else 503,
+        )
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/", response_class=HTMLResponse)
+    async def serve_root():
+        try:
+            with open("static/index.html", "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return HTMLResponse(content="<h1>index.html not found</h1>", status_code=404)
+        except Exception as e:
+            return HTMLResponse(content=f"<h1>Error: {e}</h1>", status_code=500)
+
+    return app
@@ -0,0 +1,285 @@
+# === Batch / Folder Ingestion ===
+#
+# Scans a directory of existing recordings (optionally watching it for new files),
+# skips anything MongoDB already has or an upload is processing, and runs process_video
+# on the rest in place, with at most `parallelism` jobs at a time. Uploads into the
+# folder are written under a temporary name, so a scan never picks up a partial file.
+# OpenAI calls from batch jobs are queued behind interactive uploads (see
+# openai_scheduler), and each job still goes through scratch-space admission.
+#
+#   python batch_ingest.py "\\LANSTAIAPP\Documents\Sessions\recordings" --parallelism 4 --output report.json
+#   python batch_ingest.py /mnt/recordings --watch --poll-seconds 60
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import statistics
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import openai_scheduler
+import pipeline
+
+logger = logging.getLogger(__name__)
+
+DEDUP_QUERY_BATCH = 500
+# Reports of finished batches stay available through /batch/{id} for this long
+FINISHED_BATCH_TTL_SECONDS = float(os.getenv("BATCH_REPORT_TTL_HOURS", "24")) * 3600
+MAX_FINISHED_BATCHES = 100
+
+_batches: Dict[str, "BatchIngest"] = {}
+_batches_lock = threading.Lock()
+
+
+class BatchIngest:
+    def __init__(
+        self,
+        directory: str,
+        process: Callable[..., Awaitable[dict]],
+        collection,
+        parallelism: int = 2,
+        recursive: bool = False,
+        watch: bool = False,
+        poll_seconds: float = 30.0,
+        user_id: str = "batch",
+        exclude_dirs: Iterable[str] = (),
+        is_active: Optional[Callable[[str], bool]] = None,
+    ):
+        self.batch_id = uuid.uuid4().hex
+        self.directory = directory
+        self.process = process
+        self.collection = collection
+        self.parallelism = max(1, parallelism)
+        self.recursive = recursive
+        self.watch = watch
+        self.poll_seconds = poll_seconds
+        self.user_id = user_id
+        self.exclude_dirs = {os.path.abspath(d) for d in exclude_dirs}
+        self.is_active = is_active
+
+        self.results: List[dict] = []
+        self.skipped = 0
+        self.in_progress = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._seen = set()
+        self._active_stems = set()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # === Discovery ===
+    def scan(self) -> List[str]:
+        found = []
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) not in self.exclude_dirs]
+            for name in files:
+                if name.lower().endswith(pipeline.VIDEO_EXTENSIONS):
+                    found.append(os.path.abspath(os.path.join(root, name)))
+            if not self.recursive:
+                break
+        return sorted(found)
+
+    def _stable(self, paths: List[str]) -> List[str]:
+        # In watch mode a file is only picked up once its size stops changing between polls
+        stable = []
+        for path in paths:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if not self.watch or self._sizes.get(path) == size:
+                stable.append(path)
+            self._sizes[path] = size
+        return stable
+
+    def _already_processed(self, paths: List[str]) -> set:
+        done = set()
+        for i in range(0, len(paths), DEDUP_QUERY_BATCH):
+            chunk = paths[i:i + DEDUP_QUERY_BATCH]
+            for doc in self.collection.find({"video_path": {"$in": chunk}}, {"video_path": 1, "_id": 0}):
+                done.add(doc["video_path"])
+        return done
+
+    def enqueue_new(self) -> int:
+        candidates = [p for p in self._stable(self.scan()) if p not in self._seen]
+        if not candidates:
+            return 0
+        done = self._already_processed(candidates)
+        queued = 0
+        for path in candidates:
+            self._seen.add(path)
+            if path in done:
+                self.skipped += 1
+                continue
+            if self.is_active and self.is_active(path):
+                # An upload is processing it right now and will record it
+                self.in_progress += 1
+                continue
+            self._queue.put(path)
+            queued += 1
+        logger.info(f"[BATCH] {self.batch_id}: queued {queued} new recordings, {len(done)} already processed")
+        return queued
+
+    # === Execution ===
+    def _run_one(self, path: str) -> dict:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        result = {"video_path": path, "bytes": os.path.getsize(path)}
+        start = time.perf_counter()
+        try:
+            outcome = asyncio.run(self.process(path, stem, self.user_id))
+            result["status"] = outcome.get("status", "unknown")
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+            logger.error(f"[BATCH] {path} failed: {detail}")
+            result["status"] = "error"
+            result["error"] = str(detail)
+        result["elapsed_s"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def _worker(self):
+        openai_scheduler.set_interactive(False)
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            if self._stop.is_set():
+                continue
+            stem = os.path.splitext(os.path.basename(path))[0]
+            # Intermediates and output docs are named after the file stem, so two
+            # recordings with the same stem must not run at the same time
+            while True:
+                with self._lock:
+                    if stem not in self._active_stems:
+                        self._active_stems.add(stem)
+                        break
+                time.sleep(1.0)
+            try:
+                result = self._run_one(path)
+            finally:
+                with self._lock:
+                    self._active_stems.discard(stem)
+            with self._lock:
+                self.results.append(result)
+                done = len(self.results)
+            logger.info(f"[BATCH] {self.batch_id}: {path} -> {result['status']} in {result['elapsed_s']}s ({done} done, {self._queue.qsize()} queued)")
+
+    def run(self) -> dict:
+        self.started_at = time.time()
+        workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.parallelism)]
+        for worker in workers:
+            worker.start()
+        try:
+            self.enqueue_new()
+            while self.watch and not self._stop.wait(self.poll_seconds):
+                self.enqueue_new()
+        except KeyboardInterrupt:
+            logger.info(f"[BATCH] {self.batch_id}: interrupted, finishing jobs already running")
+            self._stop.set()
+        finally:
+            # Workers skip anything still queued once the batch has been stopped
+            for _ in workers:
+                self._queue.put(None)
+            for worker in workers:
+                worker.join()
+            self.finished_at = time.time()
+        return self.report()
+
+    def start(self) -> "BatchIngest":
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        with _batches_lock:
+            _prune_batches()
+            _batches[self.batch_id] = self
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # === Reporting ===
+    def report(self) -> dict:
+        with self._lock:
+            results = list(self.results)
+        ok = [r for r in results if r["status"] == "success"]
+        wall = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        elapsed = sorted(r["elapsed_s"] for r in ok)
+        processed_bytes = sum(r["bytes"] for r in ok)
+        return {
+            "batch_id": self.batch_id,
+            "directory": self.directory,
+            "status": "finished" if self.finished_at else "running",
+            "parallelism": self.parallelism,
+            "queued": self._queue.qsize(),
+            "completed": len(results),
+            "succeeded": len(ok),
+            "failed": sum(1 for r in results if r["status"] == "error"),
+            "skipped_already_processed": self.skipped + sum(1 for r in results if r["status"] == "skipped"),
+            "skipped_in_progress": self.in_progress,
+            "wall_s": round(wall, 1),
+            "recordings_per_hour": round(len(ok) / wall * 3600, 2) if wall else None,
+            "gb_per_hour": round(processed_bytes / 1024 ** 3 / wall * 3600, 3) if wall else None,
+            "job_p50_s": round(statistics.median(elapsed), 1) if elapsed else None,
+            "job_p95_s": round(elapsed[int(0.95 * (len(elapsed) - 1))], 1) if elapsed else None,
+            "failures": [{"video_path": r["video_path"], "error": r.get("error")} for r in results if r["status"] == "error"][:100],
+        }
+
+
+def _prune_batches():
+    # Caller holds _batches_lock. Running batches are always kept.
+    now = time.time()
+    finished = sorted((b for b in _batches.values() if b.finished_at), key=lambda b: b.finished_at)
+    expired = [b for b in finished if now - b.finished_at > FINISHED_BATCH_TTL_SECONDS]
+    expired += finished[len(expired):max(len(expired), len(finished) - MAX_FINISHED_BATCHES)]
+    for batch in expired:
+        del _batches[batch.batch_id]
+
+
+def get_batch(batch_id: str) -> Optional[BatchIngest]:
+    with _batches_lock:
+        _prune_batches()
+        return _batches.get(batch_id)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Process a folder of existing recordings in place.")
+    parser.add_argument("directory", nargs="?", help="Folder to scan (default: the profile's recordings folder).")
+    parser.add_argument("--profile", help="Pipeline profile (default: PIPELINE_PROFILE or smb).")
+    parser.add_argument("--parallelism", type=int, default=2, help="Maximum concurrent process_video jobs.")
+    parser.add_argument("--recursive", action="store_true", help="Scan sub-folders too.")
+    parser.add_argument("--watch", action="store_true", help="Keep polling the folder for new recordings.")
+    parser.add_argument("--poll-seconds", type=float, default=30.0, help="Polling interval in watch mode.")
+    parser.add_argument("--user-id", default="batch", help="user_id recorded for batch-processed meetings.")
+    parser.add_argument("--output", help="Write the throughput report as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    settings = pipeline.Settings.from_env(args.profile)
+    settings.batch_workers = max(settings.batch_workers, args.parallelism)
+    core = pipeline.Pipeline(settings)
+    core.prepare_storage()
+    batch = BatchIngest(
+        args.directory or settings.video_dir,
+        core.process_batch_video,
+        core.collection,
+        parallelism=args.parallelism,
+        recursive=args.recursive,
+        watch=args.watch,
+        poll_seconds=args.poll_seconds,
+        user_id=args.user_id,
+        exclude_dirs=core.work_dirs,
+    )
+    report = batch.run()
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,457 @@
+# === Offline End-to-End Pipeline Benchmark ===
+#
+# Drives the pipeline core (smb profile via main.py, azure profile via app.py)
+# against synthetic ffmpeg test videos, with local stand-ins for OpenAI (Whisper +
+# ChatCompletion), MongoDB, Azure Blob Storage and DuckDuckGo/web fetches. Nothing
+# leaves the machine.
+#
+#   python benchmark.py --app main --durations 300 1800 --concurrency 1 4
+#   python benchmark.py --app app --durations 300 --concurrency 2 --rpm 20 --output bench.json
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("benchmark")
+
+DUMMY_AZURE_CONN_STR = (
+    "DefaultEndpointsProtocol=https;AccountName=benchmark;"
+    "AccountKey=YmVuY2htYXJr;EndpointSuffix=core.windows.net"
+)
+
+
+# === Synthetic Inputs ===
+def make_video(duration: int, cache_dir: str) -> str:
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"synthetic_{duration}s.mp4")
+    if os.path.exists(path):
+        return path
+    tmp = path + ".part.mp4"
+    logger.info(f"[BENCH] Generating {duration}s synthetic video: {path}")
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size=640x360:rate=15:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-crf", "28",
+        "-c:a", "aac", "-b:a", "96k", "-shortest", tmp,
+    ], check=True)
+    os.replace(tmp, path)
+    return path
+
+
+def probe_duration(path: str) -> float:
+    # A wrong duration would silently skew the Whisper stand-in's latency and output,
+    # so a file neither ffprobe nor ffmpeg can read is an error rather than 0 s
+    if shutil.which("ffprobe"):
+        proc = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            capture_output=True, text=True,
+        )
+        output = proc.stdout.strip()
+    else:
+        proc = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True)
+        match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", proc.stderr)
+        output = str(int(match[1]) * 3600 + int(match[2]) * 60 + float(match[3])) if match else ""
+    try:
+        return float(output)
+    except ValueError:
+        raise RuntimeError(f"Could not read the duration of {path}: {proc.stderr.strip()[-500:]}")
+
+
+# === Stand-ins ===
+class _Response(dict):
+    __getattr__ = dict.__getitem__
+
+
+class FakeQuota:
+    """Sliding one-minute request window; raises like the real API on overflow."""
+
+    def __init__(self, rpm: int):
+        self.rpm = rpm
+        self.calls = deque()
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        if not self.rpm:
+            return
+        now = time.monotonic()
+        with self._lock:
+            while self.calls and self.calls[0] <= now - 60:
+                self.calls.popleft()
+            if len(self.calls) >= self.rpm:
+                self.rejected += 1
+                raise _rate_limit_error("Rate limit reached for requests (benchmark stand-in)")
+            self.calls.append(now)
+
+
+def _rate_limit_error(message: str) -> Exception:
+    try:
+        import openai.error
+        return openai.error.RateLimitError(message)
+    except Exception:
+        return RuntimeError(message)
+
+
+FAKE_SUMMARY = """Benchmark Implementation Guide
+
+1. Overview
+1.1 Purpose: synthetic summary produced by the benchmark stand-in.
+
+2. Steps
+2.1 Run the pipeline.
+2.2 Inspect the metrics.
+
+*Suggested next steps: No specific next steps mentioned in this segment.*
+"""
+
+FAKE_DOT = """```dot
+digraph G { "Meeting" -> "Transcript"; "Meeting" -> "Summary"; "Summary" -> "Mind Map"; }
+```"""
+
+
+class FakeOpenAI:
+    def __init__(self, whisper_latency: float, whisper_latency_per_min: float, chat_latency: float,
+                 rpm: int, with_mindmap: bool):
+        self.whisper_latency = whisper_latency
+        self.whisper_latency_per_min = whisper_latency_per_min
+        self.chat_latency = chat_latency
+        # Real quotas are per model, as the scheduler's buckets are
+        self.quotas = {"whisper-1": FakeQuota(rpm), "gpt-4o": FakeQuota(rpm)}
+        self.with_mindmap = with_mindmap
+        self.calls = {"whisper": 0, "chat": 0}
+
+    def _whisper(self, model, file, response_format):
+        self.quotas[model].hit()
+        self.calls["whisper"] += 1
+        duration = probe_duration(file.name)
+        time.sleep(self.whisper_latency + self.whisper_latency_per_min * duration / 60)
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(start + 10.0, duration)
+            segments.append({"start": start, "end": end, "text": " benchmark speech" * 5})
+            start = end
+        text = "".join(s["text"] for s in segments)
+        # Like the SDK: "text" returns the bare string, verbose_json the parsed response
+        if response_format == "text":
+            return text.strip()
+        return _Response(text=text, segments=segments)
+
+    def transcribe(self, model=None, file=None, response_format="json", **kwargs):
+        return self._whisper(model, file, response_format)
+
+    def translate(self, model=None, file=None, response_format="json", **kwargs):
+        return self._whisper(model, file, response_format)
+
+    @property
+    def rejected(self) -> int:
+        return sum(quota.rejected for quota in self.quotas.values())
+
+    def chat(self, model=None, messages=None, max_tokens=0, **kwargs):
+        self.quotas[model].hit()
+        self.calls["chat"] += 1
+        time.sleep(self.chat_latency)
+        prompt_tokens = sum(len(m["content"]) for m in messages or []) // 4
+        content = FAKE_SUMMARY + (FAKE_DOT if self.with_mindmap else "")
+        return _Response(
+            choices=[_Response(message=_Response(content=content))],
+            usage={"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                   "total_tokens": prompt_tokens + len(content) // 4},
+        )
+
+    def install(self, openai_module):
+        openai_module.Audio.transcribe = staticmethod(self.transcribe)
+        openai_module.Audio.translate = staticmethod(self.translate)
+        openai_module.ChatCompletion.create = staticmethod(self.chat)
+
+
+class FakeCollection:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.docs: List[dict] = []
+        self._lock = threading.Lock()
+
+    def find_one(self, query: dict):
+        time.sleep(self.latency)
+        with self._lock:
+            for doc in self.docs:
+                if all(doc.get(k) == v for k, v in query.items()):
+                    return doc
+        return None
+
+    def insert_one(self, doc: dict):
+        time.sleep(self.latency)
+        with self._lock:
+            self.docs.append(dict(doc))
+        return SimpleNamespace(inserted_id=len(self.docs))
+
+
+class FakeBlobClient:
+    def __init__(self, path: str, mbps: float):
+        self.path = path
+        self.mbps = mbps
+
+    def upload_blob(self, data, overwrite=True):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "wb") as out:
+            shutil.copyfileobj(data, out)
+        if self.mbps:
+            time.sleep(os.path.getsize(self.path) / (self.mbps * 1024 * 1024))
+
+
+class FakeBlobService:
+    def __init__(self, root: str, mbps: float):
+        self.root = root
+        self.mbps = mbps
+
+    def get_blob_client(self, container: str, blob: str):
+        return FakeBlobClient(os.path.join(self.root, container, blob), self.mbps)
+
+    def get_account_information(self):
+        return {"sku_name": "Standard_LRS", "account_kind": "StorageV2"}
+
+
+class FakeDDGS:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def text(self, query, max_results=1):
+        return [{"href": f"https://example.invalid/{query}"}][:max_results]
+
+
+def fake_http_get(latency: float):
+    def get(url, timeout=None):
+        time.sleep(latency)
+        return SimpleNamespace(text="<html><body>" + "<p>Benchmark web context paragraph.</p>" * 6 + "</body></html>")
+    return get
+
+
+# === Harness ===
+def load_pipeline(app_name: str, scratch: str, args) -> SimpleNamespace:
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("SCRATCH_MIN_FREE_GB", "0")
+    os.environ.setdefault("OPENAI_SCHEDULER_DB", os.path.join(scratch, "openai_scheduler.sqlite3"))
+    os.environ.setdefault("PIPELINE_WORKERS", str(max(args.concurrency)))
+    if args.rpm:
+        # Pace the scheduler to the stand-in's quota unless the limits were set explicitly
+        os.environ.setdefault("OPENAI_WHISPER_RPM", str(args.rpm))
+        os.environ.setdefault("OPENAI_CHAT_RPM", str(args.rpm))
+    if app_name == "main":
+        os.environ["STORAGE_ROOT"] = os.path.join(scratch, "share")
+    else:
+        os.environ.setdefault("AZURE_STORAGE_CONNECTION_STRING", DUMMY_AZURE_CONN_STR)
+
+    module = importlib.import_module(app_name)
+    core = module.core
+    core.prepare_storage()
+    clients = importlib.import_module("pipeline")
+    fake_openai = FakeOpenAI(args.whisper_latency, args.whisper_latency_per_min, args.chat_latency,
+                             args.rpm, with_mindmap=shutil.which("dot") is not None)
+    fake_openai.install(clients.openai)
+    core.collection.set(FakeCollection(args.mongo_latency))
+    clients.DDGS.set(FakeDDGS)
+    clients.http_get.set(fake_http_get(args.web_latency))
+    clients.blob_service_client.set(FakeBlobService(os.path.join(scratch, "blobs"), args.blob_mbps))
+    if core.settings.keep_recordings:
+        upload_dir = core.settings.video_dir
+    else:
+        upload_dir = os.path.join(scratch, "uploads")
+        os.makedirs(upload_dir, exist_ok=True)
+    return SimpleNamespace(module=module, core=core, openai=fake_openai, upload_dir=upload_dir)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return 0
+
+
+class ResourceSampler(threading.Thread):
+    def __init__(self, scratch: str, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.scratch = scratch
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_disk = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.sample()
+            self._done.wait(self.interval)
+
+    def sample(self):
+        self.peak_rss = max(self.peak_rss, _current_rss())
+        self.peak_disk = max(self.peak_disk, _dir_size(self.scratch))
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.sample()
+
+
+def run_job(pipeline: SimpleNamespace, app_name: str, video: str, index: int, duration: int) -> dict:
+    # Emulate the upload endpoint: the received file lands where the app would write it
+    dest = os.path.join(pipeline.upload_dir, f"bench_{index:04d}_{duration}s.mp4")
+    shutil.copyfile(video, dest)
+    meeting_id = str(uuid.uuid4())
+    start = time.perf_counter()
+    result = {"index": index, "duration_s": duration, "meeting_id": meeting_id}
+    try:
+        outcome = asyncio.run(pipeline.core.process_video(dest, meeting_id, str(index)))
+        result["status"] = outcome.get("status", "unknown")
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e) or type(e).__name__
+    result["elapsed_s"] = round(time.perf_counter() - start, 3)
+    record = pipeline.core.collection.find_one({"meeting_id": meeting_id})
+    job_metrics = (record or {}).get("metrics", {})
+    result["stages"] = job_metrics.get("stages", {})
+    result["ffmpeg_peak_rss_bytes"] = job_metrics.get("ffmpeg_peak_rss_bytes", 0)
+    return result
+
+
+def run_scenario(pipeline, app_name: str, video: str, duration: int, concurrency: int, jobs: int,
+                 scratch: str, counter: List[int]) -> dict:
+    sampler = ResourceSampler(scratch)
+    sampler.start()
+    rejected_before = pipeline.openai.rejected
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = []
+        for _ in range(jobs):
+            counter[0] += 1
+            futures.append(pool.submit(run_job, pipeline, app_name, video, counter[0], duration))
+        results = [f.result() for f in futures]
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    ok = [r for r in results if r["status"] == "success"]
+    latencies = sorted(r["elapsed_s"] for r in ok)
+    stage_totals: Dict[str, List[float]] = {}
+    for r in ok:
+        for name, seconds in r["stages"].items():
+            stage_totals.setdefault(name, []).append(seconds)
+
+    return {
+        "app": app_name,
+        "duration_s": duration,
+        "concurrency": concurrency,
+        "jobs": jobs,
+        "succeeded": len(ok),
+        "wall_s": round(wall, 3),
+        "e2e_p50_s": round(statistics.median(latencies), 3) if latencies else None,
+        "e2e_max_s": round(latencies[-1], 3) if latencies else None,
+        "throughput_jobs_per_min": round(len(ok) / wall * 60, 3) if wall else None,
+        "media_min_per_wall_min": round(len(ok) * duration / wall, 3) if wall else None,
+        "stage_mean_s": {k: round(statistics.mean(v), 3) for k, v in sorted(stage_totals.items())},
+        "openai_429s": pipeline.openai.rejected - rejected_before,
+        "peak_rss_mb": round(sampler.peak_rss / 1024 / 1024, 1),
+        "peak_ffmpeg_rss_mb": round(max((r["ffmpeg_peak_rss_bytes"] for r in results), default=0) / 1024 / 1024, 1),
+        "peak_disk_mb": round(sampler.peak_disk / 1024 / 1024, 1),
+        "errors": sorted({r["error"] for r in results if r["status"] == "error"}),
+    }
+
+
+def print_report(rows: List[dict]):
+    header = f"{'app':<5} {'dur(s)':>7} {'conc':>4} {'ok/jobs':>8} {'p50(s)':>8} {'max(s)':>8} {'jobs/min':>9} {'media x':>8} {'429s':>5} {'rss MB':>7} {'disk MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['app']:<5} {r['duration_s']:>7} {r['concurrency']:>4} {str(r['succeeded']) + '/' + str(r['jobs']):>8} "
+              f"{r['e2e_p50_s'] or '-':>8} {r['e2e_max_s'] or '-':>8} {r['throughput_jobs_per_min'] or '-':>9} "
+              f"{r['media_min_per_wall_min'] or '-':>8} {r['openai_429s']:>5} {r['peak_rss_mb']:>7} {r['peak_disk_mb']:>8}")
+        if r["stage_mean_s"]:
+            print("      stages: " + ", ".join(f"{k}={v}s" for k, v in r["stage_mean_s"].items()))
+        for err in r["errors"]:
+            print(f"      error: {err}")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the video processing pipeline.")
+    parser.add_argument("--app", choices=["main", "app"], default="main", help="Deployment to drive: main (smb profile) or app (azure profile).")
+    parser.add_argument("--durations", type=int, nargs="+", default=[300, 1800, 3600, 10800], help="Synthetic video lengths in seconds.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1], help="Concurrent uploads per scenario.")
+    parser.add_argument("--jobs", type=int, default=0, help="Jobs per scenario (default: equal to concurrency).")
+    parser.add_argument("--whisper-latency", type=float, default=1.0, help="Fixed seconds per Whisper call.")
+    parser.add_argument("--whisper-latency-per-min", type=float, default=0.5, help="Extra Whisper seconds per audio minute.")
+    parser.add_argument("--chat-latency", type=float, default=15.0, help="Seconds per ChatCompletion call.")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests-per-minute limit per model for the OpenAI stand-in and, unless OPENAI_*_RPM are set, the scheduler (0 = unlimited).")
+    parser.add_argument("--mongo-latency", type=float, default=0.005, help="Seconds per MongoDB operation.")
+    parser.add_argument("--web-latency", type=float, default=0.5, help="Seconds per web page fetch (web context enabled).")
+    parser.add_argument("--blob-mbps", type=float, default=50.0, help="Simulated blob upload bandwidth in MB/s (azure storage, 0 = unlimited).")
+    parser.add_argument("--cache-dir", default=".bench_cache", help="Where synthetic videos are generated and reused.")
+    parser.add_argument("--keep-scratch", action="store_true", help="Keep the scratch directory for inspection.")
+    parser.add_argument("--output", help="Write the report as JSON to this path.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
+    if shutil.which("ffmpeg") is None:
+        sys.exit("benchmark.py needs ffmpeg on PATH")
+    scratch = tempfile.mkdtemp(prefix="video_bench_")
+    tempfile.tempdir = os.path.join(scratch, "tmp")
+    os.makedirs(tempfile.tempdir, exist_ok=True)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    try:
+        pipeline = load_pipeline(args.app, scratch, args)
+        rows = []
+        counter = [0]
+        for duration in args.durations:
+            video = make_video(duration, args.cache_dir)
+            for concurrency in args.concurrency:
+                logger.info(f"[BENCH] app={args.app} duration={duration}s concurrency={concurrency}")
+                rows.append(run_scenario(pipeline, args.app, video, duration, concurrency,
+                                         args.jobs or concurrency, scratch, counter))
+        print_report(rows)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "scenarios": rows}, f, indent=2)
+            logger.info(f"[BENCH] Report written to: {args.output}")
+    finally:
+        if not args.keep_scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+# === Live Meeting Transcription (incremental, while the meeting is running) ===
+#
+#   POST /live/{meeting_id}/segments   file + index (+ user_id): a recorder uploads audio/video every few minutes
+#   POST /live/{meeting_id}/tail       path (+ user_id): follow a recording that is still being written
+#   GET  /live/{meeting_id}            -> segments transcribed so far and the rolling partial transcript
+#   POST /live/{meeting_id}/end        -> waits for outstanding segments, then runs only the summary/docs step
+#
+# Each incoming segment is cut into 5-minute 16 kHz mono FLAC chunks (the same shape
+# split_audio_chunks produces) and transcribed straight away; the text is kept on disk
+# under the session directory so any uvicorn worker can serve status or end the
+# meeting. A tailed recording is read by a background thread and piped into an ffmpeg
+# segmenter, and every finished 5-minute segment is transcribed as soon as ffmpeg
+# lists it. When the meeting ends, only the last partial segment is still pending,
+# so time-to-document is roughly one summarization call. Segment ffmpeg/Whisper work
+# runs on the pipeline's worker pool, alongside uploads.
+
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+import metrics
+import openai_scheduler
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SECONDS = 300
+TAIL_POLL_SECONDS = float(os.getenv("LIVE_TAIL_POLL_SECONDS", "2"))
+TAIL_IDLE_SECONDS = float(os.getenv("LIVE_TAIL_IDLE_SECONDS", "600"))
+END_WAIT_SECONDS = float(os.getenv("LIVE_END_WAIT_SECONDS", "120"))
+SEGMENT_ATTEMPTS = 3
+COPY_BLOCK = 1024 * 1024
+
+_tails: Dict[str, "LiveTail"] = {}
+_tails_lock = threading.Lock()
+
+
+class LiveSession:
+    def __init__(self, root: str, meeting_id: str):
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", meeting_id)[:120]
+        if not safe_id.strip("."):
+            raise HTTPException(status_code=400, detail="Invalid meeting_id")
+        self.meeting_id = meeting_id
+        self.dir = os.path.join(root, safe_id)
+        self.meta_path = os.path.join(self.dir, "session.json")
+        self.text_dir = os.path.join(self.dir, "text")
+        self.audio_dir = os.path.join(self.dir, "audio")
+        # Marker files shared between workers: "end" asks a tail to stop, "tail.done" says it has
+        self.end_marker = os.path.join(self.dir, "end")
+        self.tail_done_marker = os.path.join(self.dir, "tail.done")
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_path)
+
+    @property
+    def meta(self) -> dict:
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Unknown live meeting")
+
+    def open(self, user_id: str, mode: str, video_path: Optional[str] = None) -> dict:
+        """Create the session, or join it if one is already running in the same mode."""
+        if self.exists:
+            meta = self.meta
+            if meta["mode"] != mode:
+                raise HTTPException(status_code=409, detail=f"Meeting is already being transcribed from {meta['mode']}")
+            return meta
+        os.makedirs(self.text_dir, exist_ok=True)
+        os.makedirs(self.audio_dir, exist_ok=True)
+        meta = {
+            "meeting_id": self.meeting_id,
+            "user_id": user_id,
+            "mode": mode,
+            "video_path": os.path.abspath(video_path) if video_path else None,
+            "started": time.time(),
+        }
+        _write_atomic(self.meta_path, json.dumps(meta))
+        return meta
+
+    def segment_indexes(self) -> List[int]:
+        try:
+            names = os.listdir(self.text_dir)
+        except FileNotFoundError:
+            return []
+        return sorted({int(name.split("_", 1)[0]) for name in names if name.endswith(".txt")})
+
+    def transcript(self) -> str:
+        try:
+            names = sorted(name for name in os.listdir(self.text_dir) if name.endswith(".txt"))
+        except FileNotFoundError:
+            return ""
+        parts = []
+        for name in names:
+            with open(os.path.join(self.text_dir, name), "r", encoding="utf-8") as f:
+                parts.append(f.read())
+        return "".join(parts)
+
+    def transcribe_audio(self, media_path: str, index: int, transcribe: Callable[[str], str]) -> int:
+        """Cut ``media_path`` into Whisper-sized FLAC chunks, transcribe them and store the
+        text as segment ``index``. Returns the number of chunks."""
+        pattern = os.path.join(self.audio_dir, f"{index:06d}_%03d.flac")
+        metrics.run_ffmpeg([
+            "ffmpeg", "-y", "-loglevel", "error", "-i", media_path,
+            "-vn", "-ar", "16000", "-ac", "1",
+            "-f", "segment", "-segment_time", str(SEGMENT_SECONDS),
+            "-c:a", "flac", pattern
+        ], "live_split")
+        chunks = sorted(
+            name for name in os.listdir(self.audio_dir)
+            if name.startswith(f"{index:06d}_") and name.endswith(".flac")
+        )
+        # Nothing is saved unless every chunk was transcribed, so a failed segment
+        # counts as missing rather than as a partial one
+        texts = {}
+        try:
+            for chunk in chunks:
+                texts[chunk[:-len(".flac")]] = transcribe(os.path.join(self.audio_dir, chunk))
+        finally:
+            for chunk in chunks:
+                _remove(os.path.join(self.audio_dir, chunk))
+        for key, text in texts.items():
+            self.save_text(key, text)
+        return len(chunks)
+
+    def save_text(self, key: str, text: str):
+        _write_atomic(os.path.join(self.text_dir, f"{key}.txt"), text)
+
+    def failed_segments(self) -> List[int]:
+        """Tailed segments that were given up on after SEGMENT_ATTEMPTS."""
+        try:
+            with open(self.tail_done_marker, "r", encoding="utf-8") as f:
+                return json.load(f).get("failed_segments", [])
+        except FileNotFoundError:
+            return []
+
+    def remove(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class LiveTail(threading.Thread):
+    """Follows a recording that is still growing and transcribes it segment by segment.
+
+    New bytes are piped into ffmpeg's stdin rather than using ``-follow``, so closing
+    stdin when the meeting ends (or the file stops growing) cleanly flushes the last
+    partial segment. This requires a container that can be read front to back while it
+    is written (MKV, TS, FLV, WAV...); an MP4 still being recorded has no index yet.
+    """
+
+    def __init__(self, session: LiveSession, source_path: str, transcribe: Callable[[str], str],
+                 submit: Callable[..., Future]):
+        super().__init__(daemon=True)
+        self.session = session
+        self.source_path = source_path
+        self.transcribe = transcribe
+        self.submit = submit
+        self.segment_list = os.path.join(session.audio_dir, "segments.csv")
+        self.error: Optional[str] = None
+        self.failed: List[int] = []
+        self._done_segments = set()
+        self._failures: Dict[str, int] = {}
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _should_stop(self) -> bool:
+        return self._stopping.is_set() or os.path.exists(self.session.end_marker)
+
+    def _listed_segments(self) -> List[str]:
+        # ffmpeg appends a line only once the segment file has been closed
+        try:
+            with open(self.segment_list, "r", encoding="utf-8") as f:
+                return [line.split(",", 1)[0] for line in f.read().splitlines() if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _transcribe_ready(self):
+        for name in self._listed_segments():
+            if name in self._done_segments:
+                continue
+            path = os.path.join(self.session.audio_dir, name)
+            index = int(re.sub(r"\D", "", name))
+            try:
+                self.session.save_text(f"{index:06d}_000", self.submit(self._transcribe_one, path).result())
+            except Exception as e:
+                self._failures[name] = self._failures.get(name, 0) + 1
+                logger.error(f"[LIVE] {self.session.meeting_id}: {name} failed ({self._failures[name]}/{SEGMENT_ATTEMPTS}): {e}")
+                if self._failures[name] < SEGMENT_ATTEMPTS:
+                    continue
+                self.failed.append(index)
+            _remove(path)
+            self._done_segments.add(name)
+
+    def _transcribe_one(self, path: str) -> str:
+        with metrics.stage("live_segment"):
+            return self.transcribe(path)
+
+    def run(self):
+        openai_scheduler.set_job_priority(SEGMENT_SECONDS, interactive=True)
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error", "-i", "pipe:0",
+            "-vn", "-ar", "16000", "-ac", "1",
+            "-f", "segment", "-segment_time", str(SEGMENT_SECONDS),
+            "-segment_list", self.segment_list, "-segment_list_type", "csv",
+            "-c:a", "flac", os.path.join(self.session.audio_dir, "tail_%06d.flac"),
+        ]
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        stderr = []
+        reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+        reader.start()
+        offset = 0
+        last_growth = time.monotonic()
+        try:
+            with open(self.source_path, "rb") as source:
+                while not self._should_stop():
+                    block = source.read(COPY_BLOCK)
+                    if block:
+                        proc.stdin.write(block)
+                        offset += len(block)
+                        last_growth = time.monotonic()
+                        continue
+                    proc.stdin.flush()
+                    self._transcribe_ready()
+                    if time.monotonic() - last_growth > TAIL_IDLE_SECONDS:
+                        logger.info(f"[LIVE] {self.session.meeting_id}: {self.source_path} stopped growing, ending tail")
+                        break
+                    time.sleep(TAIL_POLL_SECONDS)
+        except (BrokenPipeError, OSError) as e:
+            self.error = str(e)
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+            proc.wait()
+            reader.join()
+
+        if proc.returncode != 0:
+            self.error = self.error or (b"".join(stderr).decode(errors="replace").strip() or f"ffmpeg exited with {proc.returncode}")
+            logger.error(f"[LIVE] {self.session.meeting_id}: tail failed: {self.error}")
+        for _ in range(SEGMENT_ATTEMPTS):
+            self._transcribe_ready()
+        metrics.record_bytes("live_tail", offset)
+        _write_atomic(self.session.tail_done_marker,
+                      json.dumps({"bytes": offset, "error": self.error, "failed_segments": sorted(self.failed)}))
+        with _tails_lock:
+            if _tails.get(self.session.dir) is self:
+                del _tails[self.session.dir]
+
+
+def create_router(
+    sessions_root: str,
+    transcribe: Callable[[str], str],
+    finalize: Callable[..., Awaitable[dict]],
+    submit: Callable[..., Future],
+) -> APIRouter:
+    """Live transcription endpoints.
+
+    ``transcribe(path)`` returns the text for one audio chunk and raises if Whisper
+    fails (tailed segments are retried, uploaded segments get a 502 so the recorder
+    can send them again),
+    ``finalize(meeting_id, user_id, transcript, video_path)`` turns the full transcript
+    into the meeting's documents (summary, mind map, storage, Mongo record), and
+    ``submit(fn, *args)`` runs segment work on the worker pool and returns its future.
+    """
+    router = APIRouter()
+
+    def _transcribe_segment(session: LiveSession, media_path: str, index: int) -> int:
+        openai_scheduler.set_job_priority(SEGMENT_SECONDS, interactive=True)
+        with metrics.stage("live_segment"):
+            return session.transcribe_audio(media_path, index, transcribe)
+
+    def _receive_segment(session: LiveSession, user_id: str, file: UploadFile, media_path: str):
+        session.open(user_id, "segments")
+        if os.path.exists(session.end_marker):
+            raise HTTPException(status_code=409, detail="Meeting has already ended")
+        with open(media_path, "wb") as out, metrics.stage("receive_upload"):
+            shutil.copyfileobj(file.file, out, COPY_BLOCK)
+        metrics.record_file_bytes("receive_upload", media_path)
+
+    @router.post("/live/{meeting_id}/segments")
+    async def upload_segment(
+        meeting_id: str,
+        file: UploadFile = File(...),
+        index: int = Form(...),
+        user_id: str = Form("")
+    ):
+        if index < 0:
+            raise HTTPException(status_code=400, detail="Segment index must be >= 0")
+        session = LiveSession(sessions_root, meeting_id)
+        ext = os.path.splitext(file.filename or "")[1] or ".bin"
+        media_path = os.path.join(session.audio_dir, f"in_{index:06d}{ext}")
+        try:
+            await run_in_threadpool(_receive_segment, session, user_id, file, media_path)
+            chunks = await asyncio.wrap_future(submit(_transcribe_segment, session, media_path, index))
+        except HTTPException:
+            raise
+        except subprocess.CalledProcessError:
+            raise HTTPException(status_code=400, detail=f"Could not decode segment {index}")
+        except Exception as e:
+            logger.error(f"[LIVE] {meeting_id}: segment {index} failed: {e}")
+            raise HTTPException(status_code=502, detail=f"Transcription of segment {index} failed, upload it again: {e}")
+        finally:
+            _remove(media_path)
+        logger.info(f"[LIVE] {meeting_id}: segment {index} transcribed ({chunks} chunks)")
+        return {"meeting_id": meeting_id, "segment": index, "segments": len(session.segment_indexes())}
+
+    @router.post("/live/{meeting_id}/tail")
+    async def start_tail(meeting_id: str, path: str = Form(...), user_id: str = Form("")):
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=400, detail=f"File not found: {path}")
+        session = LiveSession(sessions_root, meeting_id)
+        if session.exists and session.meta["mode"] == "tail":
+            raise HTTPException(status_code=409, detail="Meeting is already being tailed")
+        session.open(user_id, "tail", video_path=path)
+        tail = LiveTail(session, path, transcribe, submit)
+        with _tails_lock:
+            _tails[session.dir] = tail
+        tail.start()
+        logger.info(f"[LIVE] {meeting_id}: tailing {path}")
+        return {"meeting_id": meeting_id, "status": "tailing"}
+
+    @router.get("/live/{meeting_id}")
+    async def live_status(meeting_id: str):
+        session = LiveSession(sessions_root, meeting_id)
+        meta = session.meta
+        return {
+            "meeting_id": meeting_id,
+            "mode": meta["mode"],
+            "elapsed_s": round(time.time() - meta["started"], 1),
+            "segments": session.segment_indexes(),
+            "transcript": session.transcript(),
+        }
+
+    def _wait_for_segments(session: LiveSession, meta: dict, expected_segments: Optional[int]):
+        deadline = time.monotonic() + END_WAIT_SECONDS
+        with _tails_lock:
+            tail = _tails.get(session.dir)
+        if tail:
+            tail.stop()
+            tail.join(timeout=END_WAIT_SECONDS)
+        elif meta["mode"] == "tail":
+            # The tail runs in another worker process; it picks up the end marker on its next poll
+            while not os.path.exists(session.tail_done_marker) and time.monotonic() < deadline:
+                time.sleep(TAIL_POLL_SECONDS)
+        if expected_segments:
+            while len(session.segment_indexes()) < expected_segments and time.monotonic() < deadline:
+                time.sleep(1.0)
+
+    @router.post("/live/{meeting_id}/end")
+    async def end_meeting(meeting_id: str, expected_segments: Optional[int] = Form(None)):
+        session = LiveSession(sessions_root, meeting_id)
+        meta = session.meta
+        _write_atomic(session.end_marker, str(time.time()))
+        with metrics.stage("live_end_wait"):
+            await run_in_threadpool(_wait_for_segments, session, meta, expected_segments)
+
+        received = session.segment_indexes()
+        missing = sorted(set(range(expected_segments)) - set(received)) if expected_segments else []
+        failed = session.failed_segments()
+        if missing or failed:
+            logger.warning(f"[LIVE] {meeting_id}: finalizing without segments {sorted(set(missing) | set(failed))[:20]}")
+        transcript = session.transcript()
+        if not transcript.strip():
+            session.remove()
+            raise HTTPException(status_code=400, detail="Empty transcription")
+
+        try:
+            result = await finalize(meeting_id, meta["user_id"], transcript, meta.get("video_path"))
+        except HTTPException:
+            raise
+        except Exception as e:
+            # The session (and its transcript) is kept so /end can be retried
+            logger.exception(f"[LIVE] {meeting_id}: finalizing failed")
+            raise HTTPException(status_code=500, detail=str(e))
+        session.remove()
+        # The documents were built without these, so the caller knows the transcript has gaps
+        if missing:
+            result = {**result, "missing_segments": missing}
+        if failed:
+            result = {**result, "failed_segments": failed}
+        return JSONResponse(content=result)
+
+    return router
+
+
+def _write_atomic(path: str, text: str):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,267 @@
+# === Pipeline Metrics (Prometheus text format + per-job breakdown) ===
+
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+JOB_BUCKETS = (10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 10800)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _fmt_labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        escaped = [(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{self._fmt_labels(key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (), buckets=STAGE_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # Layout: one cumulative count per bucket, then +Inf count, then sum
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for i, bound in enumerate(self.buckets):
+                    lines.append(f"{self.name}_bucket{self._fmt_labels(key, ('le', str(bound)))} {series[i]}")
+                count = series[len(self.buckets)]
+                lines.append(f"{self.name}_bucket{self._fmt_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{self._fmt_labels(key)} {series[-1]}")
+                lines.append(f"{self.name}_count{self._fmt_labels(key)} {count}")
+        return lines
+
+
+# === Registry ===
+STAGE_SECONDS = Histogram("video_pipeline_stage_seconds", "Wall-clock time spent in each pipeline stage.", ("stage",))
+JOB_SECONDS = Histogram("video_pipeline_job_seconds", "End-to-end wall-clock time per job.", ("status",), buckets=JOB_BUCKETS)
+STAGE_BYTES = Counter("video_pipeline_stage_bytes_total", "Bytes produced or transferred by each stage.", ("stage",))
+FFMPEG_CPU_SECONDS = Counter("video_pipeline_ffmpeg_cpu_seconds_total", "User+system CPU seconds consumed by ffmpeg.", ("stage",))
+OPENAI_REQUESTS = Counter("video_pipeline_openai_requests_total", "OpenAI API calls by endpoint and outcome.", ("endpoint", "status"))
+OPENAI_TOKENS = Counter("video_pipeline_openai_tokens_total", "OpenAI tokens reported in API usage.", ("endpoint", "kind"))
+RETRIES = Counter("video_pipeline_retries_total", "Retried operations.", ("operation",))
+JOBS_IN_FLIGHT = Gauge("video_pipeline_jobs_in_flight", "Jobs currently being processed.")
+JOBS_WAITING = Gauge("video_pipeline_jobs_waiting", "Jobs waiting for a pipeline worker.")
+
+REGISTRY = [STAGE_SECONDS, JOB_SECONDS, STAGE_BYTES, FFMPEG_CPU_SECONDS, OPENAI_REQUESTS, OPENAI_TOKENS, RETRIES, JOBS_IN_FLIGHT, JOBS_WAITING]
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# === Per-Job Breakdown ===
+class JobMetrics:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started_at = time.time()
+        self.total_seconds = 0.0
+        self.stages: Dict[str, float] = {}
+        self.bytes: Dict[str, int] = {}
+        self.ffmpeg_cpu_seconds: Dict[str, float] = {}
+        self.ffmpeg_peak_rss_bytes = 0
+        self.openai_tokens: Dict[str, int] = {}
+        self.openai_requests = 0
+        self.retries: Dict[str, int] = {}
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "total_seconds": round(self.total_seconds or time.time() - self.started_at, 3),
+            "stages": {k: round(v, 3) for k, v in self.stages.items()},
+            "bytes": dict(self.bytes),
+            "ffmpeg_cpu_seconds": {k: round(v, 3) for k, v in self.ffmpeg_cpu_seconds.items()},
+            "ffmpeg_peak_rss_bytes": self.ffmpeg_peak_rss_bytes,
+            "openai_tokens": dict(self.openai_tokens),
+            "openai_requests": self.openai_requests,
+            "retries": dict(self.retries),
+        }
+
+
+_current_job: ContextVar[Optional[JobMetrics]] = ContextVar("current_job", default=None)
+
+
+def current_job() -> Optional[JobMetrics]:
+    return _current_job.get()
+
+
+def queue_depth() -> int:
+    """Jobs accepted but still waiting for a worker."""
+    return int(JOBS_WAITING.get())
+
+
+def jobs_in_flight() -> int:
+    return int(JOBS_IN_FLIGHT.get())
+
+
+@contextmanager
+def track_job(job_id: str):
+    job = JobMetrics(job_id)
+    token = _current_job.set(job)
+    JOBS_IN_FLIGHT.inc()
+    status = "error"
+    try:
+        yield job
+        status = "success"
+    finally:
+        job.total_seconds = time.time() - job.started_at
+        JOB_SECONDS.observe(job.total_seconds, status=status)
+        JOBS_IN_FLIGHT.dec()
+        _current_job.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        job = current_job()
+        if job:
+            job.stages[name] = job.stages.get(name, 0.0) + elapsed
+
+
+def record_bytes(stage_name: str, amount: int):
+    STAGE_BYTES.inc(amount, stage=stage_name)
+    job = current_job()
+    if job:
+        job.bytes[stage_name] = job.bytes.get(stage_name, 0) + amount
+
+
+def record_file_bytes(stage_name: str, path: str):
+    if path and os.path.exists(path):
+        record_bytes(stage_name, os.path.getsize(path))
+
+
+def record_retry(operation: str):
+    RETRIES.inc(operation=operation)
+    job = current_job()
+    if job:
+        job.retries[operation] = job.retries.get(operation, 0) + 1
+
+
+def record_openai(endpoint: str, ok: bool = True, usage: Optional[dict] = None):
+    OPENAI_REQUESTS.inc(endpoint=endpoint, status="ok" if ok else "error")
+    job = current_job()
+    if job:
+        job.openai_requests += 1
+    for kind in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        count = (usage or {}).get(kind)
+        if not count:
+            continue
+        OPENAI_TOKENS.inc(count, endpoint=endpoint, kind=kind)
+        if job:
+            job.openai_tokens[kind] = job.openai_tokens.get(kind, 0) + count
+
+
+def run_ffmpeg(cmd: List[str], stage_name: str):
+    """Run an ffmpeg command like ``subprocess.run(cmd, check=True)``, recording
+    wall time and, where ``os.wait4`` is available, the child's CPU time and peak RSS."""
+    with stage(stage_name):
+        if not hasattr(os, "wait4"):
+            return subprocess.run(cmd, check=True)
+        proc = subprocess.Popen(cmd)
+        try:
+            _, status, usage = os.wait4(proc.pid, 0)
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        cpu = usage.ru_utime + usage.ru_stime
+        FFMPEG_CPU_SECONDS.inc(cpu, stage=stage_name)
+        job = current_job()
+        if job:
+            job.ffmpeg_cpu_seconds[stage_name] = job.ffmpeg_cpu_seconds.get(stage_name, 0.0) + cpu
+            # ru_maxrss is in kilobytes on Linux
+            job.ffmpeg_peak_rss_bytes = max(job.ffmpeg_peak_rss_bytes, usage.ru_maxrss * 1024)
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+        return subprocess.CompletedProcess(cmd, proc.returncode)
+
+
+def probe(check: Callable[[], object]) -> dict:
+    start = time.perf_counter()
+    try:
+        check()
+        return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+    except Exception as e:
+        return {"ok": False, "latency_ms": round((time.perf_counter() - start) * 1000, 1), "error": str(e)}
@@ -0,0 +1,260 @@
+# === OpenAI Request Scheduler (shared across uvicorn workers) ===
+#
+# Every Whisper / ChatCompletion call goes through call(). Requests-per-minute and
+# tokens-per-minute are enforced with token buckets kept in a local SQLite file, so
+# all worker processes on the host draw from the same quota. Waiting callers are
+# served in priority order (short and interactive meetings first), and a 429 puts
+# the whole model on a shared cooldown instead of every worker retrying at once.
+
+import contextlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = os.getenv("OPENAI_SCHEDULER_DB", os.path.join(tempfile.gettempdir(), "openai_scheduler.sqlite3"))
+
+# Per-model limits: requests/min and tokens/min (0 = not enforced)
+LIMITS: Dict[str, Dict[str, int]] = {
+    "whisper-1": {
+        "rpm": int(os.getenv("OPENAI_WHISPER_RPM", "50")),
+        "tpm": 0,
+    },
+    "gpt-4o": {
+        "rpm": int(os.getenv("OPENAI_CHAT_RPM", "500")),
+        "tpm": int(os.getenv("OPENAI_CHAT_TPM", "30000")),
+    },
+}
+
+MAX_RATE_LIMIT_RETRIES = int(os.getenv("OPENAI_MAX_429_RETRIES", "6"))
+MAX_COOLDOWN_SECONDS = 60.0
+WAITER_TTL_SECONDS = 30.0
+POLL_SECONDS = 0.25
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 100_000
+
+_priority: ContextVar[float] = ContextVar("openai_priority", default=PRIORITY_INTERACTIVE + 3600)
+_interactive: ContextVar[bool] = ContextVar("openai_interactive", default=True)
+_local = threading.local()
+
+
+def set_interactive(interactive: bool):
+    """Mark work started from this context as interactive (HTTP upload) or batch."""
+    _interactive.set(interactive)
+    _priority.set((PRIORITY_INTERACTIVE if interactive else PRIORITY_BATCH) + 3600)
+
+
+def set_job_priority(audio_seconds: float, interactive: Optional[bool] = None):
+    """Shorter meetings and interactive uploads are scheduled first (lower = sooner)."""
+    if interactive is None:
+        interactive = _interactive.get()
+    base = PRIORITY_INTERACTIVE if interactive else PRIORITY_BATCH
+    _priority.set(base + max(audio_seconds, 0.0))
+
+
+def estimate_tokens(*texts: str, max_tokens: int = 0) -> int:
+    # ~4 characters per token for English text, plus the completion budget
+    return sum(len(t) for t in texts) // 4 + max_tokens
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(STATE_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS buckets (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            blocked_until REAL NOT NULL DEFAULT 0,
+            strikes INTEGER NOT NULL DEFAULT 0
+        )""")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS waiters (
+            id TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            priority REAL NOT NULL,
+            enqueued REAL NOT NULL,
+            heartbeat REAL NOT NULL
+        )""")
+        _local.conn = conn
+    return conn
+
+
+def _bucket(conn: sqlite3.Connection, name: str, capacity: float, now: float):
+    row = conn.execute("SELECT tokens, updated, blocked_until, strikes FROM buckets WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        conn.execute("INSERT INTO buckets (name, tokens, updated) VALUES (?, ?, ?)", (name, capacity, now))
+        return capacity, 0.0, 0
+    tokens, updated, blocked_until, strikes = row
+    tokens = min(capacity, tokens + (now - updated) * capacity / 60.0)
+    return tokens, blocked_until, strikes
+
+
+def _try_acquire(model: str, waiter_id: str, priority: float, enqueued: float, need: Dict[str, float]) -> float:
+    """One scheduling attempt. Returns 0 when the request may proceed, else seconds to wait."""
+    conn = _connect()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO waiters (id, model, priority, enqueued, heartbeat) VALUES (?, ?, ?, ?, ?)",
+            (waiter_id, model, priority, enqueued, now),
+        )
+        conn.execute("DELETE FROM waiters WHERE heartbeat < ?", (now - WAITER_TTL_SECONDS,))
+        head = conn.execute(
+            "SELECT id FROM waiters WHERE model = ? ORDER BY priority, enqueued LIMIT 1", (model,)
+        ).fetchone()
+        if head and head[0] != waiter_id:
+            conn.execute("COMMIT")
+            return POLL_SECONDS
+
+        wait = 0.0
+        levels = {}
+        for kind, amount in need.items():
+            capacity = LIMITS[model][kind]
+            name = f"{model}:{kind}"
+            tokens, blocked_until, _ = _bucket(conn, name, capacity, now)
+            levels[name] = tokens
+            amount = min(amount, capacity)
+            if blocked_until > now:
+                wait = max(wait, blocked_until - now)
+            if tokens < amount:
+                wait = max(wait, (amount - tokens) * 60.0 / capacity)
+
+        if wait > 0:
+            conn.execute("COMMIT")
+            return min(wait, POLL_SECONDS * 4)
+
+        for kind, amount in need.items():
+            name = f"{model}:{kind}"
+            conn.execute(
+                "UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?",
+                (levels[name] - min(amount, LIMITS[model][kind]), now, name),
+            )
+        conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+        conn.execute("COMMIT")
+        return 0.0
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _withdraw(waiter_id: str):
+    conn = _connect()
+    conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+
+
+def _adjust_tokens(model: str, delta: float):
+    if not LIMITS[model]["tpm"] or not delta:
+        return
+    conn = _connect()
+    conn.execute("UPDATE buckets SET tokens = tokens - ? WHERE name = ?", (delta, f"{model}:tpm"))
+
+
+def _cooldown(model: str, retry_after: Optional[float]):
+    conn = _connect()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for kind in ("rpm", "tpm"):
+            if not LIMITS[model][kind]:
+                continue
+            name = f"{model}:{kind}"
+            tokens, blocked_until, strikes = _bucket(conn, name, LIMITS[model][kind], now)
+            delay = retry_after or min(MAX_COOLDOWN_SECONDS, 2.0 ** strikes)
+            conn.execute(
+                "UPDATE buckets SET tokens = 0, updated = ?, blocked_until = ?, strikes = ? WHERE name = ?",
+                (now, max(blocked_until, now + delay), strikes + 1, name),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _clear_strikes(model: str):
+    conn = _connect()
+    conn.execute("UPDATE buckets SET strikes = 0 WHERE name LIKE ? AND strikes > 0", (f"{model}:%",))
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    return type(error).__name__ == "RateLimitError" or getattr(error, "http_status", None) == 429
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def wait_for_slot(model: str, estimated_tokens: int = 0):
+    limits = LIMITS.get(model)
+    if not limits:
+        return
+    need = {"rpm": 1}
+    if limits["tpm"]:
+        need["tpm"] = estimated_tokens
+    need = {kind: amount for kind, amount in need.items() if limits[kind]}
+    if not need:
+        return
+
+    waiter_id = uuid.uuid4().hex
+    enqueued = time.time()
+    priority = _priority.get()
+    try:
+        with metrics.stage("openai_wait"):
+            while True:
+                wait = _try_acquire(model, waiter_id, priority, enqueued, need)
+                if not wait:
+                    return
+                time.sleep(wait)
+    except BaseException:
+        _withdraw(waiter_id)
+        raise
+
+
+def call(model: str, fn: Callable, /, *args, estimated_tokens: int = 0, stage: Optional[str] = None, **kwargs):
+    """Run ``fn(*args, **kwargs)`` once the shared quota for ``model`` allows it.
+
+    ``model`` and ``fn`` are positional-only, so callers can pass ``model=`` on to the SDK.
+    ``stage`` times only the SDK call itself; queueing is reported as ``openai_wait``.
+
+    Rate-limit errors put the model on a shared cooldown and are retried here;
+    any other exception propagates to the caller unchanged.
+    """
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        wait_for_slot(model, estimated_tokens)
+        try:
+            with metrics.stage(stage) if stage else contextlib.nullcontext():
+                response = fn(*args, **kwargs)
+        except Exception as e:
+            if not _is_rate_limit(e) or attempt == MAX_RATE_LIMIT_RETRIES:
+                raise
+            metrics.record_retry("openai_429")
+            _cooldown(model, _retry_after(e))
+            logger.warning(f"[RATE LIMIT] {model} returned 429; retry {attempt + 1}/{MAX_RATE_LIMIT_RETRIES}")
+            # The file handle for audio uploads has been consumed by the failed attempt
+            for value in list(args) + list(kwargs.values()):
+                if hasattr(value, "seek"):
+                    value.seek(0)
+            continue
+
+        _clear_strikes(model)
+        usage = response.get("usage") if isinstance(response, dict) else None
+        if usage and usage.get("total_tokens") and estimated_tokens:
+            _adjust_tokens(model, usage["total_tokens"] - estimated_tokens)
+        return response
@@ -0,0 +1,824 @@
+# === Shared Pipeline Core ===
+#
+# The one implementation of video -> transcript -> summary/mind map -> documents used
+# by every deployment. A profile (PIPELINE_PROFILE) picks the stage implementations,
+# and each choice can be overridden from the environment:
+#
+#   profile  OUTPUT_STORAGE  OUTPUT_FORMAT  CAPTIONS  WEB_CONTEXT  DENOISE  WHISPER_TASK  KEEP_RECORDINGS  SQL_SCHEMA
+#   smb      smb             docx           0         1            1        transcribe    1                1   (was main.py)
+#   azure    azure           pdf            1         0            0        translate     0                0   (was app.py)
+#
+# Jobs from HTTP and resumable uploads and live meeting segments run off the event loop
+# on a bounded worker pool (PIPELINE_WORKERS); batch ingestion has its own pool
+# (BATCH_WORKERS), so it never queues interactive work.
+
+import asyncio
+import contextvars
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote_plus
+
+from fastapi import HTTPException
+
+import metrics
+import openai_scheduler
+import scratch
+import startup
+
+logger = logging.getLogger(__name__)
+
+# === Heavy dependencies (imported on first use, see startup.py) ===
+http_get = startup.lazy_import("requests", "get")
+DDGS = startup.lazy_import("duckduckgo_search", "DDGS")
+BeautifulSoup = startup.lazy_import("bs4", "BeautifulSoup")
+Document = startup.lazy_import("docx", "Document")
+Inches = startup.lazy_import("docx.shared", "Inches")
+Source = startup.lazy_import("graphviz", "Source")
+FPDF = startup.lazy_import("fpdf", "FPDF")
+
+
+def _load_openai():
+    import openai
+    openai.api_key = os.getenv("OPENAI_API_KEY")
+    return openai
+
+openai = startup.Lazy("openai", _load_openai)
+
+# === MongoDB ===
+mongo_user = quote_plus("LanTech")
+mongo_password = quote_plus("L@nc^ere@0012")
+mongo_host = "192.168.48.201"
+mongo_port = "27017"
+MONGO_URI = f"mongodb://{mongo_user}:{mongo_password}@{mongo_host}:{mongo_port}/SuperDB?authSource=admin"
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
+
+
+def _connect_mongo():
+    from pymongo import MongoClient
+    return MongoClient(MONGO_URI, serverSelectionTimeoutMS=MONGO_TIMEOUT_MS)
+
+mongo_client = startup.Lazy("mongo", _connect_mongo)
+collection = startup.Lazy("mongo_collection", lambda: mongo_client.get()["sample_db"]["test"])
+
+# === Azure Blob Storage ===
+AZURE_CONN_STR = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+AZURE_STORAGE_ACCOUNT = "connectlystorage"
+AZURE_CONTAINERS = {
+    "video": "videos",
+    "transcript": "transcripts",
+    "summary": "summary",
+    "mindmap": "summary-image"
+}
+
+
+def _connect_blob_service():
+    from azure.storage.blob import BlobServiceClient
+    return BlobServiceClient.from_connection_string(AZURE_CONN_STR)
+
+blob_service_client = startup.Lazy("azure_blob", _connect_blob_service)
+
+# === Settings ===
+STORAGE_ROOT = os.getenv("STORAGE_ROOT", r"\\LANSTAIAPP\Documents\Sessions")
+CHUNK_SECONDS = 300
+WHISPER_MAX_BYTES = 25 * 1024 * 1024
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+
+PROFILES: Dict[str, dict] = {
+    "smb": {
+        "storage": "smb", "output_format": "docx", "captions": False, "web_context": True,
+        "denoise": True, "whisper_task": "transcribe", "keep_recordings": True, "sql_schema": True,
+    },
+    "azure": {
+        "storage": "azure", "output_format": "pdf", "captions": True, "web_context": False,
+        "denoise": False, "whisper_task": "translate", "keep_recordings": False, "sql_schema": False,
+    },
+}
+
+
+def _env_flag(name: str) -> Optional[bool]:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return None
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class Settings:
+    def __init__(self, profile: str = "smb", **overrides):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown pipeline profile {profile!r} (expected one of {', '.join(PROFILES)})")
+        values = dict(PROFILES[profile])
+        values.update({key: value for key, value in overrides.items() if value is not None})
+        self.profile = profile
+        self.storage: str = values["storage"]
+        self.output_format: str = values["output_format"]
+        self.captions: bool = values["captions"]
+        self.web_context: bool = values["web_context"]
+        self.denoise: bool = values["denoise"]
+        self.whisper_task: str = values["whisper_task"]
+        self.keep_recordings: bool = values["keep_recordings"]
+        self.sql_schema: bool = values["sql_schema"]
+        self.workers: int = max(1, int(values.get("workers", 2)))
+        self.batch_workers: int = max(1, int(values.get("batch_workers", 1)))
+        if self.storage not in ("smb", "azure"):
+            raise ValueError(f"Unknown output storage {self.storage!r} (expected smb or azure)")
+        if self.output_format not in ("docx", "pdf"):
+            raise ValueError(f"Unknown output format {self.output_format!r} (expected docx or pdf)")
+        if self.whisper_task not in ("transcribe", "translate"):
+            raise ValueError(f"Unknown Whisper task {self.whisper_task!r} (expected transcribe or translate)")
+
+        # Deployments that keep recordings on the share also keep their intermediates there
+        self.video_dir = os.path.join(STORAGE_ROOT, "recordings")
+        self.output_doc_dir = os.path.join(STORAGE_ROOT, "output_docs")
+        work_root = self.video_dir if self.keep_recordings else tempfile.gettempdir()
+        self.scratch_root = values.get("scratch_root") or os.path.join(work_root, "processed" if self.keep_recordings else "video_scratch")
+        self.upload_staging_dir = values.get("upload_staging_dir") or os.path.join(work_root, "uploads" if self.keep_recordings else "video_uploads")
+        self.live_session_dir = values.get("live_session_dir") or os.path.join(work_root, "live" if self.keep_recordings else "video_live")
+
+    @classmethod
+    def from_env(cls, profile: Optional[str] = None) -> "Settings":
+        return cls(
+            profile or os.getenv("PIPELINE_PROFILE", "smb"),
+            storage=os.getenv("OUTPUT_STORAGE") or None,
+            output_format=os.getenv("OUTPUT_FORMAT") or None,
+            captions=_env_flag("CAPTIONS"),
+            web_context=_env_flag("WEB_CONTEXT"),
+            denoise=_env_flag("DENOISE"),
+            whisper_task=os.getenv("WHISPER_TASK") or None,
+            keep_recordings=_env_flag("KEEP_RECORDINGS"),
+            sql_schema=_env_flag("SQL_SCHEMA"),
+            workers=os.getenv("PIPELINE_WORKERS") or None,
+            batch_workers=os.getenv("BATCH_WORKERS") or None,
+            scratch_root=os.getenv("SCRATCH_ROOT") or None,
+            upload_staging_dir=os.getenv("UPLOAD_STAGING_DIR") or None,
+            live_session_dir=os.getenv("LIVE_SESSION_DIR") or None,
+        )
+
+    @property
+    def extract_args(self) -> List[str]:
+        """ffmpeg output options for early audio extraction during resumable uploads."""
+        return ["-vn", "-ar", "16000", "-ac", "1"] + (["-af", "afftdn"] if self.denoise else [])
+
+    def as_dict(self) -> dict:
+        return {
+            "profile": self.profile,
+            "storage": self.storage,
+            "output_format": self.output_format,
+            "captions": self.captions,
+            "web_context": self.web_context,
+            "denoise": self.denoise,
+            "whisper_task": self.whisper_task,
+            "keep_recordings": self.keep_recordings,
+            "workers": self.workers,
+            "batch_workers": self.batch_workers,
+        }
+
+
+# === Audio & Transcription ===
+def extract_audio_chunks(source_path: str, workdir: str, denoise: bool) -> List[str]:
+    """Decode (and optionally denoise) the audio track straight into 5-minute 16 kHz
+    mono FLAC chunks for Whisper, in a single ffmpeg pass."""
+    pattern = os.path.join(workdir, "chunk_%03d.flac")
+    metrics.run_ffmpeg(
+        ["ffmpeg", "-y", "-i", source_path, "-vn", "-ar", "16000", "-ac", "1"]
+        + (["-af", "afftdn"] if denoise else [])
+        + ["-f", "segment", "-segment_time", str(CHUNK_SECONDS), "-c:a", "flac", pattern],
+        "extract_audio",
+    )
+    chunks = sorted(os.path.join(workdir, f) for f in os.listdir(workdir) if f.startswith("chunk_") and f.endswith(".flac"))
+    for chunk in chunks:
+        scratch.track(chunk)
+        metrics.record_file_bytes("extract_audio", chunk)
+    return chunks
+
+
+def transcribe_chunk(path: str, task: str = "transcribe", timestamps: bool = False):
+    """One Whisper call; raises on failure. Returns the text, or the verbose_json
+    response with ``timestamps``."""
+    whisper = openai.Audio.translate if task == "translate" else openai.Audio.transcribe
+    try:
+        with open(path, "rb") as f:
+            response = openai_scheduler.call(
+                "whisper-1", whisper, model="whisper-1", file=f,
+                response_format="verbose_json" if timestamps else "text", stage="transcribe"
+            )
+    except Exception:
+        metrics.record_openai("whisper", ok=False)
+        raise
+    metrics.record_openai("whisper")
+    metrics.record_file_bytes("transcribe", path)
+    return response
+
+
+def transcribe_chunks(chunk_paths: list, task: str = "transcribe", timestamps: bool = False) -> Tuple[str, List[dict]]:
+    """Whisper each chunk in order. With ``timestamps`` the segments (shifted to the
+    position of their chunk) are returned too, for captions."""
+    full = ""
+    segments: List[dict] = []
+    for index, path in enumerate(chunk_paths):
+        for attempt in range(3):
+            if attempt:
+                metrics.record_retry("whisper")
+            try:
+                if os.path.getsize(path) > WHISPER_MAX_BYTES:
+                    logger.warning(f"[SKIP] Chunk too large: {path}")
+                    break
+                response = transcribe_chunk(path, task, timestamps)
+                if timestamps:
+                    offset = index * CHUNK_SECONDS
+                    for seg in response["segments"]:
+                        segments.append({"start": seg["start"] + offset, "end": seg["end"] + offset, "text": seg["text"]})
+                    full += "".join(seg["text"] for seg in response["segments"]) + "\n"
+                else:
+                    full += response + "\n"
+                break
+            except Exception as e:
+                logger.error(f"[ERROR] Transcription failed: {e}")
+                time.sleep(5)
+        scratch.release(path)
+    return full, segments
+
+
+# === Captions ===
+def format_srt_time(seconds: float) -> str:
+    td = timedelta(seconds=seconds)
+    total = int(td.total_seconds())
+    millis = int((td.total_seconds() - total) * 1000)
+    return f"{str(timedelta(seconds=total)).zfill(8)},{millis:03}"
+
+
+def create_srt_from_segments(segments: List[dict], output_path: str):
+    with open(output_path, "w", encoding="utf-8") as f:
+        for i, seg in enumerate(segments, start=1):
+            start = format_srt_time(seg['start'])
+            end = format_srt_time(seg['end'])
+            text = seg['text'].strip()
+            if text:
+                f.write(f"{i}\n{start} --> {end}\n{text}\n\n")
+
+
+def burn_captions(video_path: str, srt_path: str, output_path: str) -> str:
+    # One encode straight from the source; compressing first and then re-encoding
+    # with the subtitles burned in cost a second full libx264 pass
+    safe_srt_path = srt_path.replace(os.sep, "/").replace(":", "\\:")
+    metrics.run_ffmpeg([
+        "ffmpeg", "-y", "-i", video_path, "-vf", f"subtitles='{safe_srt_path}'",
+        "-c:v", "libx264", "-crf", "35", "-preset", "veryfast", "-c:a", "aac", "-b:a", "64k", output_path
+    ], "captions")
+    metrics.record_file_bytes("captions", output_path)
+    return output_path
+
+
+# === Web context ===
+def extract_keywords(transcript: str, top_n: int = 3) -> list:
+    words = re.findall(r'\b[a-zA-Z]{4,}\b', transcript.lower())
+    stop_words = {'this', 'that', 'from', 'with', 'your', 'have', 'will', 'which', 'into', 'should', 'would', 'about', 'where', 'there', 'their', 'been'}
+    filtered = [word for word in words if word not in stop_words]
+    common = Counter(filtered).most_common(top_n)
+    return [word for word, _ in common]
+
+
+def get_web_contexts(titles: list):
+    contexts = {}
+    for title in titles:
+        try:
+            with DDGS() as ddgs:
+                results = ddgs.text(title, max_results=1)
+                for r in results:
+                    url = r.get("href")
+                    html = http_get(url, timeout=10).text
+                    soup = BeautifulSoup(html, "html.parser")
+                    text = " ".join(p.get_text() for p in soup.find_all("p")[:6])
+                    contexts[title] = text[:2000]
+                    break
+        except Exception as e:
+            logger.warning(f"[SKIP] Web context failed for {title}: {e}")
+            continue
+    return "\n".join(contexts.values())
+
+
+# === Summary & Mind Map ===
+def summarize_segment(transcript: str, context: str = ""):
+    prompt = f"""
+You are a senior documentation and technical writing expert. Your task is to convert the following raw transcript segment into a comprehensive, highly accurate, and formal implementation or study guide based on the subject matter discussed.
+
+The final output must:
+
+- Be structured and formatted according to professional standards for enterprise-level training, onboarding, line pictures, and technical enablement.
+- Include step-by-step procedures, clearly numbered and logically ordered.
+- Provide real-world tools, technologies, configurations, commands, and screenshots/images (placeholders if needed) relevant to the topic.
+- Embed technical examples, use cases, CLI/GUI instructions, and expected outputs or screenshots where applicable.
+- Cover common pitfalls, troubleshooting tips, and best practices to ensure full practical understanding.
+- Use terminology and instructional depth suitable for readers to gain 100% conceptual and hands-on knowledge of the subject.
+- The final document should resemble internal documentation used at organizations like SAP, Oracle, Java, Selenium, AI/ML, Data Science, AWS, Microsoft, or Google — clear, comprehensive, and instructional in tone.
+
+- Additionally, ensure that **for every main topic, you provide 5-10 sentence descriptions** that explain key concepts and their real-world applications. For example, for "Oracle Database" or "Generative AI," give a clear explanation, its use cases, and why it is essential for enterprises. Avoid high-level jargon. Make it practical, applicable, and understandable.
+
+---
+
+OBJECTIVE:
+
+Create a detailed, real-world step-by-step implementation or process guide for [INSERT TOPIC/SUBJECT], designed specifically to support the creation of over 100 technical or comprehension questions. The guide must:
+
+- Reflect real-world tools, technologies, workflows, and industry terminology.
+- Break down each phase of the implementation or process logically and sequentially.
+- Include practical examples, code snippets (if applicable), key decisions, best practices, and commonly used tools at each step.
+- Highlight common challenges or misconceptions, and how they’re addressed in real practice.
+- Use terminology and structure that would support SMEs or instructional designers in generating high-quality technical questions based on the guide.
+- Avoid abstract or overly generic statements — focus on precision, clarity, and applied knowledge.
+
+---
+
+DOCUMENT FORMAT & STRUCTURE RULES:
+
+1. STRUCTURE
+- Use numbered sections and sub-sections (e.g., 1, 1.1, 1.2.1)
+- No markdown, emojis, or decorative formatting
+- Use plain, formal, enterprise-grade language
+
+2. EACH SECTION MUST INCLUDE:
+- A *clear title* and *brief purpose statement*
+- *Step-by-step technical or procedural instructions*, including:
+    - All relevant tools, platforms, or interfaces used (if any)
+    - Any paths, commands, actions, configurations, or API calls involved
+    - All required inputs, values, parameters, or dependencies
+    - A logical sequence of operations, clearly numbered or separated by actionable steps
+    - Tips, warnings, and Important Notes, or expected outcomes where necessary
+- **5-10 sentence description** of each main topic, explaining what the concept is, its use cases, and real-world applications. This should be clear and concise for technical audiences to understand why the topic is essential and how it fits into practical workflows.
+
+3. VALIDATION
+
+- Describe how to confirm success (e.g., Expected Outputs, System or Health Checks, Technical and Functional Verifications, Visual Indicators, Fallback/Error Conditions indicators)
+
+4. TROUBLESHOOTING (if applicable)
+
+- Clearly list frequent or known issues that may arise during or after the procedure
+- Describe the conditions or misconfigurations that typically lead to each issue
+- Provide step-by-step corrective actions or configuration changes needed to resolve each problem
+- Mention specific file paths, log viewer tools, console commands, or dashboard areas where errors and diagnostics can be found
+- Include example error codes or system messages that help in identifying the issue
+
+5. BEST PRACTICES
+
+- You are a senior technical writer. Based on the following transcript or topic, create a BEST PRACTICES section suitable for formal technical documentation, onboarding materials, or enterprise IT guides.
+- Efficiency improvements (e.g., time-saving configurations, automation tips)
+- Security or compliance tips (e.g., encryption, IAM roles, audit logging)
+- Standard operating procedures (SOPs) used in enterprise environments
+- Avoided pitfalls and why they should be avoided
+- Format the content using bullet points or short sections for clarity and actionability.
+- Avoid vague, obvious, or overly general suggestions — focus on real-world, practical insights derived from field experience or best-in-class implementation norms.
+
+6. CONCLUSION
+- Summarize what was implemented or discussed
+- Confirm expected outcomes and readiness indicators
+
+---
+
+IMPORTANT:
+If the input contains any values such as usernames, IP addresses, server names, passwords, port numbers, or similar technical identifiers — replace their actual content with generic XML-style tags, while preserving the sentence structure and purpose. For example:
+
+- Replace any specific IP address with: <ip>
+- Replace any actual password or secret with: <password>
+- Replace any actual hostname with: <hostname>
+- Replace any actual port number with: <port>
+- Replace any username with: <username>
+- Replace any email with: <email>
+
+Do NOT alter the sentence structure, meaning, or flow — keep the language intact while swapping the actual values with tags
+Do not display or retain real values — just show the placeholder tag. Maintain the original meaning and flow of the instructions.
+Format the output as clean, professional documentation, suitable for inclusion in implementation guides, SOPs, or training materials.
+Highlight any placeholders in a way that makes it easy for the user to identify where to substitute their own values later.
+
+---
+
+Also:
+- Cross-check all tools, commands, file paths, service names, APIs, and utilities with reliable, real-world sources (e.g., official vendor documentation, widely accepted best practices).
+
+ 1. If something appears ambiguous, incorrect, or outdated, correct it to its current, supported version.
+ 2. Use only commands, APIs, or tool names that are verifiably valid and relevant to the topic context.
+- Consolidate duplicate or fragmented instructions:
+ 1. If a step or process is repeated across segments, merge them into a single, complete, and accurate version.
+ 2. Remove redundancy and preserve the most detailed and correct version of each step.
+ 3. Do NOT include deprecated or unverifiable content:
+ 4. Exclude outdated commands, legacy references, or tools no longer maintained.
+ 5. Replace such content with modern equivalents where available.
+
+- Output the final result as a formal technical guide, with:
+  1. Clear section headings
+  2. Correct and tested commands/scripts
+  3. Accurate tool names and workflows
+  4. Logical flow suitable for developers, engineers, or IT teams
+
+---
+
+COMBINED INPUT:
+\"\"\"{transcript}\n\n{context}\"\"\"
+
+---
+
+FINAL INSTRUCTION:
+Return only the fully formatted implementation or process guide includes below
+
+- A clear, descriptive title
+- A concise purpose statement or overview
+- Prerequisites and tools required
+- Numbered step-by-step instructions with:
+   1. Commands, paths, configuration settings, or code blocks (as needed)
+   2. GUI or CLI actions explained clearly
+   3. Expected inputs, parameters, or options
+   4. Confirmation of success (outputs, logs, tests, or validation steps)
+   5. Troubleshooting (common issues, causes, and resolutions — if applicable)
+   6. Best Practices (efficiency, reliability, security — if applicable)
+   7. **Include a mind map diagram in DOT format enclosed in triple backticks at the end**
+   8. **Insert chart/diagram placeholders inline to represent where the visual mind map image should appear**
+
+- Replace any real usernames, IP addresses, passwords, ports, or hostnames with <username>, <ip>, <password>, <port>, or <hostname> where needed.
+- Eliminate all redundant or outdated, abused content. Only use valid and current tools and commands.
+
+End Document with Standardized "Suggested Next Steps" Note  
+*Suggested next steps: No specific next steps mentioned in this segment.*
+"""
+
+    system_prompt = "You are a technical documentation assistant trained to summarize training meetings."
+    try:
+        response = openai_scheduler.call(
+            "gpt-4o",
+            openai.ChatCompletion.create,
+            model="gpt-4o",  # Updated to valid model (gpt-4.1-nano is not a known OpenAI model)
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.4,
+            max_tokens=3000,
+            estimated_tokens=openai_scheduler.estimate_tokens(system_prompt, prompt, max_tokens=3000),
+            stage="summarize"
+        )
+        metrics.record_openai("chat", usage=response.get("usage"))
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        metrics.record_openai("chat", ok=False)
+        logger.error(f"[ERROR] Summary generation failed: {e}")
+        return "Summary generation failed."
+
+
+def split_dot_code(summary: str) -> Tuple[str, Optional[str]]:
+    """Pull the DOT mind map out of the summary, leaving a marker where it was."""
+    match = re.search(r"```dot\s*(.*?)```", summary, re.DOTALL)
+    if not match:
+        return summary, None
+    text = re.sub(r"```dot\s*.*?```", "[Mind Map Diagram Below]", summary, flags=re.DOTALL).strip()
+    return text, match.group(1).strip()
+
+
+def generate_graphviz_image(dot_code: str, path: str):
+    try:
+        s = Source(dot_code)
+        output_path = s.render(filename=path, format="png", cleanup=True)
+        logger.info(f"[GRAPHVIZ] Mind map saved to: {output_path}")
+        return output_path
+    except Exception as e:
+        logger.error(f"[ERROR] DOT render failed: {e}")
+        return None
+
+
+# === Document writers ===
+class DocxWriter:
+    extension = ".docx"
+    clients = (Document, Inches)
+
+    def transcript(self, transcript: str, path: str):
+        doc = Document()
+        doc.add_heading("Transcript", 0)
+        doc.add_paragraph(transcript)
+        doc.save(path)
+
+    def summary(self, content: str, image_path: Optional[str], dot_code: Optional[str], path: str):
+        doc = Document()
+        doc.add_heading("Summary Document", 0)
+        for line in content.splitlines():
+            doc.add_paragraph(line)
+
+        if image_path and os.path.exists(image_path):
+            doc.add_page_break()
+            doc.add_heading("Mind Map", level=1)
+            doc.add_picture(image_path, width=Inches(6))
+        elif dot_code:
+            doc.add_page_break()
+            doc.add_heading("Mind Map (DOT Format)", level=1)
+            doc.add_paragraph(dot_code)
+        doc.save(path)
+        logger.info(f"[DOCX] Summary saved to: {path}")
+
+
+class PdfWriter:
+    extension = ".pdf"
+    clients = (FPDF,)
+
+    def _write(self, content: str, path: str, image_path: Optional[str] = None):
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Arial", size=12)
+
+        for line in content.splitlines():
+            pdf.multi_cell(0, 10, line)
+
+        if image_path and os.path.exists(image_path):
+            pdf.ln(10)
+            try:
+                pdf.image(image_path, x=None, y=None, w=180)
+            except Exception as e:
+                logger.warning(f"[PDF] Failed to insert image: {e}")
+
+        pdf.output(path)
+
+    def transcript(self, transcript: str, path: str):
+        self._write(transcript, path)
+
+    def summary(self, content: str, image_path: Optional[str], dot_code: Optional[str], path: str):
+        if dot_code and not (image_path and os.path.exists(image_path)):
+            content = f"{content}\n\nMind Map (DOT Format)\n{dot_code}"
+        self._write(content, path, image_path)
+
+
+WRITERS = {"docx": DocxWriter, "pdf": PdfWriter}
+
+
+# === Output storage ===
+class ShareStorage:
+    """Outputs are written straight into the output folder on the share; records keep paths."""
+
+    name = "smb"
+    RECORD_FIELDS = {"transcript": "transcript_doc_path", "summary": "summary_doc_path",
+                     "mindmap": "mindmap_image_path", "video": "captioned_video_path"}
+    RESPONSE_FIELDS = {"transcript": "transcript_doc", "summary": "summary_doc",
+                       "mindmap": "mindmap_image", "video": "captioned_video"}
+    SKIPPED = {"status": "skipped", "message": "Video already processed"}
+    OUTPUT_SUFFIXES = {"transcript": "_transcript", "summary": "_summary", "mindmap": "_mindmap", "video": "_captioned"}
+    clients = ()
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+
+    def output_prefix(self, meeting_id: str, user_id: str, name: str) -> str:
+        return f"{meeting_id}_{user_id}_{name}"
+
+    def local_path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def publish(self, kind: str, path: str) -> str:
+        return os.path.abspath(path)
+
+    def check(self):
+        os.stat(self.output_dir)
+
+
+class AzureStorage:
+    """Outputs are built in the job's scratch directory, uploaded, then deleted; records keep URLs."""
+
+    name = "azure_blob"
+    RECORD_FIELDS = {"transcript": "transcript_url", "summary": "summary_url",
+                     "mindmap": "image_url", "video": "video_url"}
+    RESPONSE_FIELDS = {"transcript": "transcript_url", "summary": "summary_url",
+                       "mindmap": "summary_image_url", "video": "video_url"}
+    # The duplicate reply and blob names existing /upload/ clients rely on
+    SKIPPED = {"status": "already_processed", "message": "This video has already been processed."}
+    OUTPUT_SUFFIXES = {"transcript": "_transcript", "summary": "_summary", "mindmap": "_summary_graph", "video": "_captioned"}
+
+    def __init__(self, blob_service, account: str = AZURE_STORAGE_ACCOUNT, containers: Dict[str, str] = AZURE_CONTAINERS):
+        self.blob_service = blob_service
+        self.account = account
+        self.containers = containers
+        self.clients = (blob_service,) if isinstance(blob_service, startup.Lazy) else ()
+
+    def output_prefix(self, meeting_id: str, user_id: str, name: str) -> str:
+        return f"{meeting_id}_{user_id}"
+
+    def local_path(self, name: str) -> str:
+        return scratch.current_job().path(name)
+
+    def publish(self, kind: str, path: str) -> str:
+        container = self.containers[kind]
+        blob_name = os.path.basename(path)
+        blob_client = self.blob_service.get_blob_client(container=container, blob=blob_name)
+        with open(path, "rb") as data, metrics.stage("azure_upload"):
+            blob_client.upload_blob(data, overwrite=True)
+        metrics.record_file_bytes("azure_upload", path)
+        scratch.release(path)
+        return f"https://{self.account}.blob.core.windows.net/{container}/{blob_name}"
+
+    def check(self):
+        self.blob_service.get_account_information()
+
+
+# === Pipeline ===
+class Pipeline:
+    def __init__(self, settings: Settings, collection=collection, storage=None, writer=None):
+        self.settings = settings
+        self.collection = collection
+        if storage is None:
+            storage = AzureStorage(blob_service_client) if settings.storage == "azure" else ShareStorage(settings.output_doc_dir)
+        self.storage = storage
+        self.writer = writer or WRITERS[settings.output_format]()
+        self.scratch_space = scratch.ScratchSpace(
+            settings.scratch_root, extra_dirs=[settings.upload_staging_dir, settings.live_session_dir]
+        )
+        self._executor = ThreadPoolExecutor(max_workers=settings.workers, thread_name_prefix="pipeline")
+        # Batch ingestion gets its own pool, so a long batch never queues interactive uploads
+        self._batch_executor = ThreadPoolExecutor(max_workers=settings.batch_workers, thread_name_prefix="pipeline-batch")
+        self._active_videos = set()
+        self._active_cond = threading.Condition()
+
+    @property
+    def work_dirs(self) -> List[str]:
+        """Folders holding intermediates (excluded from batch ingestion)."""
+        return [self.settings.scratch_root, self.settings.upload_staging_dir, self.settings.live_session_dir]
+
+    def clients(self) -> List[startup.Lazy]:
+        """The lazy SDKs and clients this profile uses (preloaded during warm-up)."""
+        used = [openai, Source, *self.writer.clients, *self.storage.clients]
+        if self.collection is collection:
+            used += [mongo_client, collection]
+        if self.settings.web_context:
+            used += [DDGS, http_get, BeautifulSoup]
+        return used
+
+    def prepare_storage(self):
+        dirs = list(self.work_dirs)
+        if self.settings.keep_recordings:
+            dirs.append(self.settings.video_dir)
+        if isinstance(self.storage, ShareStorage):
+            dirs.append(self.storage.output_dir)
+        for path in dirs:
+            os.makedirs(path, exist_ok=True)
+        self.scratch_space.collect_orphans()
+
+    def submit(self, fn, *args, executor: Optional[ThreadPoolExecutor] = None) -> Future:
+        """Queue ``fn(*args)`` on the worker pool (PIPELINE_WORKERS unless ``executor`` is given)."""
+        # The worker inherits the caller's context, so a scratch job opened by the
+        # upload route is joined rather than duplicated
+        executor = executor or self._executor
+        context = contextvars.copy_context()
+        metrics.JOBS_WAITING.inc()
+
+        def run():
+            metrics.JOBS_WAITING.dec()
+            return context.run(fn, *args)
+
+        try:
+            return executor.submit(run)
+        except BaseException:
+            metrics.JOBS_WAITING.dec()
+            raise
+
+    async def _run(self, fn, *args, executor: Optional[ThreadPoolExecutor] = None):
+        return await asyncio.wrap_future(self.submit(fn, *args, executor=executor))
+
+    # === Entry points ===
+    async def process_video(self, video_path: str, meeting_id: str, user_id: str, prepared_audio: Optional[str] = None):
+        return await self._run(self._process_video, video_path, meeting_id, user_id, prepared_audio)
+
+    async def process_batch_video(self, video_path: str, meeting_id: str, user_id: str):
+        return await self._run(self._process_video, video_path, meeting_id, user_id, None, executor=self._batch_executor)
+
+    async def finalize_live_meeting(self, meeting_id: str, user_id: str, transcription: str, video_path: Optional[str] = None):
+        return await self._run(self._finalize_live_meeting, meeting_id, user_id, transcription, video_path)
+
+    def is_active(self, video_path: str) -> bool:
+        """Whether a job is processing this recording right now."""
+        with self._active_cond:
+            return os.path.abspath(video_path) in self._active_videos
+
+    @contextmanager
+    def _claim(self, video_path: str):
+        # An upload and a batch scan can both reach a kept recording; the second waits for
+        # the first and then finds its Mongo record instead of processing it again
+        path = os.path.abspath(video_path)
+        with self._active_cond:
+            while path in self._active_videos:
+                self._active_cond.wait()
+            self._active_videos.add(path)
+        try:
+            yield
+        finally:
+            with self._active_cond:
+                self._active_videos.discard(path)
+                self._active_cond.notify_all()
+
+    def transcribe_segment(self, path: str) -> str:
+        # Raises on failure, so the live routes can retry the segment or report it missing
+        return transcribe_chunk(path, self.settings.whisper_task) + "\n"
+
+    def find_processed(self, video_path: Optional[str], meeting_id: str, user_id: str) -> Optional[dict]:
+        # Recordings kept on the share are identified by path; uploads that are
+        # discarded after processing can only be identified by meeting and user
+        if self.settings.keep_recordings and video_path:
+            return self.collection.find_one({"video_path": os.path.abspath(video_path)})
+        return self.collection.find_one({"meeting_id": meeting_id, "user_id": user_id})
+
+    def skipped_response(self, existing: dict) -> dict:
+        response = dict(self.storage.SKIPPED)
+        for kind, field in self.storage.RESPONSE_FIELDS.items():
+            response[field] = existing.get(self.storage.RECORD_FIELDS[kind])
+        return response
+
+    def _output_path(self, prefix: str, kind: str, extension: str) -> str:
+        return self.storage.local_path(f"{prefix}{self.storage.OUTPUT_SUFFIXES[kind]}{extension}")
+
+    # === Stages ===
+    def _process_video(self, video_path: str, meeting_id: str, user_id: str, prepared_audio: Optional[str]):
+        with self._claim(video_path):
+            return self._process_claimed_video(video_path, meeting_id, user_id, prepared_audio)
+
+    def _process_claimed_video(self, video_path: str, meeting_id: str, user_id: str, prepared_audio: Optional[str]):
+        existing = self.find_processed(video_path, meeting_id, user_id)
+        if existing:
+            logger.info(f"[SKIP] Already processed: {video_path}")
+            return self.skipped_response(existing)
+
+        original_filename = os.path.splitext(os.path.basename(video_path))[0]
+        filename_prefix = f"{meeting_id}_{user_id}_{original_filename}"
+        output_prefix = self.storage.output_prefix(meeting_id, user_id, original_filename)
+        expected_bytes = scratch.estimate_job_bytes(os.path.getsize(video_path))
+        with self.scratch_space.job(filename_prefix, expected_bytes) as scratch_job, metrics.track_job(filename_prefix) as job:
+            # prepared_audio was extracted (and denoised, if enabled) while a resumable upload streamed in
+            chunk_paths = extract_audio_chunks(prepared_audio or video_path, scratch_job.dir, self.settings.denoise and not prepared_audio)
+            if prepared_audio:
+                scratch.release(prepared_audio)
+            if not chunk_paths:
+                raise HTTPException(status_code=500, detail="Audio extraction failed")
+            openai_scheduler.set_job_priority(len(chunk_paths) * CHUNK_SECONDS)
+            transcription, segments = transcribe_chunks(chunk_paths, self.settings.whisper_task, timestamps=self.settings.captions)
+            if not transcription.strip():
+                raise HTTPException(status_code=400, detail="Empty transcription")
+
+            outputs = {}
+            if self.settings.captions:
+                srt_path = scratch_job.path("captions.srt")
+                create_srt_from_segments(segments, srt_path)
+                captioned = burn_captions(video_path, srt_path, self._output_path(output_prefix, "video", ".mp4"))
+                scratch.release(srt_path)
+                outputs["video"] = self.storage.publish("video", captioned)
+            # Uploads that are not kept are intermediates of this job; only those are deleted
+            kept_path = None if os.path.abspath(video_path) in scratch_job.files else video_path
+            scratch.release(video_path)
+
+            return self._document(transcription, kept_path, original_filename, meeting_id, user_id, output_prefix, job, outputs)
+
+    def _finalize_live_meeting(self, meeting_id: str, user_id: str, transcription: str, video_path: Optional[str]):
+        # Live meetings were transcribed segment by segment; only the documents are left to build
+        filename_prefix = f"{meeting_id}_{user_id}_live"
+        with self.scratch_space.job(filename_prefix), metrics.track_job(filename_prefix) as job:
+            outputs = {"video": None} if self.settings.captions else {}
+            output_prefix = self.storage.output_prefix(meeting_id, user_id, "live")
+            return self._document(transcription, video_path, filename_prefix, meeting_id, user_id, output_prefix, job, outputs)
+
+    def _document(self, transcription: str, video_path: Optional[str], original_filename: str, meeting_id: str,
+                  user_id: str, output_prefix: str, job: metrics.JobMetrics, outputs: dict):
+        """Everything after transcription: web context, summary, mind map, documents, storage and the Mongo record."""
+        context = ""
+        if self.settings.web_context:
+            with metrics.stage("web_context"):
+                context = get_web_contexts(extract_keywords(transcription))
+
+        summary, dot_code = split_dot_code(summarize_segment(transcription, context))
+
+        mindmap_path = None
+        if dot_code:
+            with metrics.stage("mindmap"):
+                mindmap_path = generate_graphviz_image(dot_code, self._output_path(output_prefix, "mindmap", ".png")[:-len(".png")])
+
+        transcript_path = self._output_path(output_prefix, "transcript", self.writer.extension)
+        summary_path = self._output_path(output_prefix, "summary", self.writer.extension)
+        with metrics.stage(self.settings.output_format):
+            self.writer.transcript(transcription, transcript_path)
+            self.writer.summary(summary, mindmap_path, dot_code, summary_path)
+        metrics.record_file_bytes(self.settings.output_format, transcript_path)
+        metrics.record_file_bytes(self.settings.output_format, summary_path)
+
+        outputs["transcript"] = self.storage.publish("transcript", transcript_path)
+        outputs["summary"] = self.storage.publish("summary", summary_path)
+        outputs["mindmap"] = self.storage.publish("mindmap", mindmap_path) if mindmap_path else None
+
+        record = {
+            "video_path": os.path.abspath(video_path) if video_path else None,
+            "original_filename": original_filename,
+            "meeting_id": meeting_id,
+            "user_id": user_id,
+        }
+        record.update({self.storage.RECORD_FIELDS[kind]: value for kind, value in outputs.items()})
+        with metrics.stage("mongo"):
+            self.collection.insert_one({**record, "metrics": job.as_dict(), "timestamp": datetime.now()})
+
+        logger.info(f"[METRICS] {output_prefix}: {job.as_dict()}")
+        response = {"status": "success"}
+        response.update({self.storage.RESPONSE_FIELDS[kind]: value for kind, value in outputs.items()})
+        return response
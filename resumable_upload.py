@@ -0,0 +1,394 @@
+# === Resumable Chunked Uploads (init / PUT part / complete) ===
+#
+#   POST /uploads/                           {filename, size, meeting_id, user_id} -> {upload_id, part_size, parts}
+#   GET  /uploads/{upload_id}                -> which parts the server already has (for resuming)
+#   PUT  /uploads/{upload_id}/parts/{index}  raw bytes; headers X-Part-Offset, X-Part-Checksum (sha256=<hex> | crc32=<hex>)
+#   POST /uploads/{upload_id}/complete       -> runs the pipeline on the assembled file
+#
+# Parts may arrive in any order and in parallel; each is written straight into a
+# preallocated file at its offset, and a marker file records its checksum, so any
+# uvicorn worker can accept any part. While parts arrive, a background ffmpeg is fed
+# the contiguous prefix of the file so audio extraction is (usually) done by the time
+# the last part lands. Inputs that ffmpeg cannot read from a pipe (e.g. MP4 with the
+# moov atom at the end, which -xerror turns into a failure) fall back to normal
+# extraction after completion.
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+import zlib
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+import metrics
+import scratch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PART_SIZE = int(os.getenv("UPLOAD_PART_SIZE_MB", "8")) * 1024 * 1024
+MAX_PARTS = 10_000
+EXTRACT_IDLE_SECONDS = 600
+COPY_BLOCK = 1024 * 1024
+
+_extractors: Dict[str, "StreamingExtractor"] = {}
+_extractors_lock = threading.Lock()
+
+
+class UploadState:
+    def __init__(self, staging_root: str, upload_id: str):
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+            raise HTTPException(status_code=404, detail="Unknown upload")
+        self.upload_id = upload_id
+        self.dir = os.path.join(staging_root, upload_id)
+        self.meta_path = os.path.join(self.dir, "upload.json")
+        self.data_path = os.path.join(self.dir, "data")
+        self.parts_dir = os.path.join(self.dir, "parts")
+        self.audio_path = os.path.join(self.dir, "audio.wav")
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Unknown upload")
+
+    @classmethod
+    def create(cls, staging_root: str, meta: dict) -> "UploadState":
+        upload_id = uuid.uuid4().hex
+        upload_dir = os.path.join(staging_root, upload_id)
+        os.makedirs(os.path.join(upload_dir, "parts"), exist_ok=True)
+        with open(os.path.join(upload_dir, "data"), "wb") as f:
+            f.truncate(meta["size"])
+        with open(os.path.join(upload_dir, "upload.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return cls(staging_root, upload_id)
+
+    @property
+    def size(self) -> int:
+        return self.meta["size"]
+
+    @property
+    def part_size(self) -> int:
+        return self.meta["part_size"]
+
+    @property
+    def part_count(self) -> int:
+        return max(1, -(-self.size // self.part_size))
+
+    def part_range(self, index: int):
+        start = index * self.part_size
+        return start, min(start + self.part_size, self.size)
+
+    def received_parts(self) -> List[int]:
+        try:
+            return sorted(int(name) for name in os.listdir(self.parts_dir) if name.isdigit())
+        except FileNotFoundError:
+            return []
+
+    def contiguous_bytes(self) -> int:
+        received = set(self.received_parts())
+        index = 0
+        while index in received:
+            index += 1
+        return min(self.size, index * self.part_size)
+
+    def mark_received(self, index: int, checksum: str):
+        marker = os.path.join(self.parts_dir, f"{index:06d}")
+        with open(marker + ".tmp", "w", encoding="utf-8") as f:
+            f.write(checksum)
+        os.replace(marker + ".tmp", marker)
+
+
+def _parse_checksum(header: Optional[str]):
+    if not header or "=" not in header:
+        raise HTTPException(status_code=400, detail="X-Part-Checksum header is required (sha256=<hex> or crc32=<hex>)")
+    algorithm, expected = header.split("=", 1)
+    algorithm = algorithm.strip().lower()
+    if algorithm == "sha256":
+        return algorithm, expected.strip().lower(), hashlib.sha256()
+    if algorithm == "crc32":
+        return algorithm, expected.strip().lower(), None
+    raise HTTPException(status_code=400, detail=f"Unsupported checksum algorithm: {algorithm}")
+
+
+def _move_into_place(source: str, destination: str):
+    # The destination may be on another volume, where move copies; the copy gets a temporary
+    # name so nothing scanning the destination folder sees a partial file
+    partial = destination + ".part"
+    shutil.move(source, partial)
+    os.replace(partial, destination)
+
+
+def _open_at(path: str, offset: int):
+    data = open(path, "r+b")
+    data.seek(offset)
+    return data
+
+
+def _write_block(data, block: bytes, digest, crc: int) -> int:
+    """Write one block of a part and fold it into its checksum; returns the running CRC."""
+    data.write(block)
+    if digest:
+        digest.update(block)
+        return crc
+    return zlib.crc32(block, crc)
+
+
+class StreamingExtractor(threading.Thread):
+    """Feeds the contiguous prefix of a growing upload into ffmpeg to extract audio early."""
+
+    def __init__(self, upload: UploadState, ffmpeg_args: List[str]):
+        super().__init__(daemon=True)
+        self.upload = upload
+        self.ffmpeg_args = ffmpeg_args
+        self.ok = False
+        self.progress = threading.Event()
+        self.cancelled = False
+
+    def run(self):
+        cmd = ["ffmpeg", "-y", "-loglevel", "fatal", "-xerror", "-i", "pipe:0", *self.ffmpeg_args, self.upload.audio_path]
+        fed = 0
+        last_progress = time.monotonic()
+        start = time.perf_counter()
+        try:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        except OSError as e:
+            logger.warning(f"[UPLOAD] Early extraction unavailable: {e}")
+            return
+        try:
+            with open(self.upload.data_path, "rb") as data:
+                while fed < self.upload.size and not self.cancelled:
+                    available = self.upload.contiguous_bytes()
+                    if available <= fed:
+                        if time.monotonic() - last_progress > EXTRACT_IDLE_SECONDS:
+                            logger.info(f"[UPLOAD] {self.upload.upload_id}: upload idle, stopping early extraction")
+                            break
+                        # Parts accepted by other workers are only visible through the marker files
+                        self.progress.wait(1.0)
+                        self.progress.clear()
+                        continue
+                    data.seek(fed)
+                    while fed < available:
+                        block = data.read(min(COPY_BLOCK, available - fed))
+                        proc.stdin.write(block)
+                        fed += len(block)
+                    last_progress = time.monotonic()
+            proc.stdin.close()
+        except (BrokenPipeError, OSError, ValueError):
+            # ffmpeg gave up on the stream (e.g. non-streamable MP4); fall back after completion
+            pass
+        finally:
+            if fed < self.upload.size or self.cancelled:
+                proc.kill()
+            returncode = proc.wait()
+        self.ok = returncode == 0 and fed == self.upload.size and os.path.exists(self.upload.audio_path)
+        if self.ok:
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - start, stage="early_extract_audio")
+        logger.info(f"[UPLOAD] {self.upload.upload_id}: early extraction {'succeeded' if self.ok else 'not used'}")
+
+
+def _start_extractor(upload: UploadState, ffmpeg_args: Optional[List[str]]):
+    if not ffmpeg_args:
+        return
+    with _extractors_lock:
+        if upload.upload_id not in _extractors:
+            extractor = StreamingExtractor(upload, ffmpeg_args)
+            _extractors[upload.upload_id] = extractor
+            extractor.start()
+
+
+def _pop_extractor(upload_id: str) -> Optional[StreamingExtractor]:
+    with _extractors_lock:
+        return _extractors.pop(upload_id, None)
+
+
+def create_router(
+    staging_root: str,
+    scratch_space: scratch.ScratchSpace,
+    process: Callable[..., Awaitable[dict]],
+    allowed_extensions: Optional[tuple] = None,
+    destination: Optional[Callable[[str], str]] = None,
+    extract_args: Optional[List[str]] = None,
+    find_existing: Optional[Callable[[str, str, str], Optional[dict]]] = None,
+) -> APIRouter:
+    """Build the /uploads routes for an app.
+
+    ``process(video_path, meeting_id, user_id, prepared_audio=...)`` runs the pipeline.
+    ``destination(filename)`` optionally moves the assembled file to its permanent
+    location first; otherwise it is treated as a scratch intermediate.
+    ``extract_args`` are the ffmpeg output options used for early audio extraction.
+    ``find_existing(filename, meeting_id, user_id)`` returns the response for a
+    recording that has already been processed (or None), so it is not uploaded again.
+    """
+    router = APIRouter()
+
+    def _create_upload(meta: dict) -> UploadState:
+        upload = UploadState.create(staging_root, meta)
+        try:
+            # Held until complete hands it to the processing job, or the upload is aborted
+            scratch_space.reserve(upload.upload_id, f"upload_{upload.upload_id}",
+                                  upload.size + scratch.estimate_job_bytes(upload.size), upload.dir, upload.data_path)
+        except scratch.InsufficientScratchSpace:
+            shutil.rmtree(upload.dir, ignore_errors=True)
+            raise
+        return upload
+
+    @router.post("/uploads/")
+    async def init_upload(
+        filename: str = Form(...),
+        size: int = Form(...),
+        meeting_id: str = Form(...),
+        user_id: str = Form(...),
+        part_size: int = Form(DEFAULT_PART_SIZE),
+    ):
+        if allowed_extensions and not filename.lower().endswith(allowed_extensions):
+            raise HTTPException(status_code=400, detail=f"Unsupported file format. Use {', '.join(allowed_extensions)}")
+        if size <= 0:
+            raise HTTPException(status_code=400, detail="size must be positive")
+        if find_existing:
+            existing = await run_in_threadpool(find_existing, os.path.basename(filename), meeting_id, user_id)
+            if existing:
+                logger.info(f"[UPLOAD] {filename}: already processed, not uploading again")
+                return JSONResponse(content=existing)
+        part_size = max(part_size, 1024 * 1024, -(-size // MAX_PARTS))
+        try:
+            upload = await run_in_threadpool(_create_upload, {
+                "filename": os.path.basename(filename),
+                "size": size,
+                "part_size": part_size,
+                "meeting_id": meeting_id,
+                "user_id": user_id,
+                "created": time.time(),
+            })
+        except scratch.InsufficientScratchSpace as e:
+            raise HTTPException(status_code=507, detail=str(e))
+        _start_extractor(upload, extract_args)
+        logger.info(f"[UPLOAD] {upload.upload_id}: {filename} ({size} bytes, {upload.part_count} parts)")
+        return {"upload_id": upload.upload_id, "part_size": part_size, "parts": upload.part_count}
+
+    @router.get("/uploads/{upload_id}")
+    async def upload_status(upload_id: str):
+        upload = await run_in_threadpool(UploadState, staging_root, upload_id)
+        return {
+            "upload_id": upload_id,
+            "size": upload.size,
+            "part_size": upload.part_size,
+            "parts": upload.part_count,
+            "received": await run_in_threadpool(upload.received_parts),
+        }
+
+    @router.put("/uploads/{upload_id}/parts/{index}")
+    async def upload_part(upload_id: str, index: int, request: Request):
+        upload = await run_in_threadpool(UploadState, staging_root, upload_id)
+        if not 0 <= index < upload.part_count:
+            raise HTTPException(status_code=400, detail="Part index out of range")
+        start, end = upload.part_range(index)
+        offset = request.headers.get("X-Part-Offset")
+        if offset is not None and offset.strip() != str(start):
+            raise HTTPException(status_code=400, detail=f"Part {index} must start at offset {start}")
+        algorithm, expected, digest = _parse_checksum(request.headers.get("X-Part-Checksum"))
+
+        crc = 0
+        written = 0
+        # File I/O and hashing run in worker threads, a COPY_BLOCK at a time
+        data = await run_in_threadpool(_open_at, upload.data_path, start)
+        try:
+            with metrics.stage("receive_upload"):
+                pending = bytearray()
+                async for block in request.stream():
+                    if written + len(pending) + len(block) > end - start:
+                        raise HTTPException(status_code=400, detail=f"Part {index} is larger than {end - start} bytes")
+                    pending += block
+                    if len(pending) >= COPY_BLOCK:
+                        crc = await run_in_threadpool(_write_block, data, pending, digest, crc)
+                        written += len(pending)
+                        pending = bytearray()
+                if pending:
+                    crc = await run_in_threadpool(_write_block, data, pending, digest, crc)
+                    written += len(pending)
+        finally:
+            await run_in_threadpool(data.close)
+        if written != end - start:
+            raise HTTPException(status_code=400, detail=f"Part {index} must be {end - start} bytes, got {written}")
+        actual = digest.hexdigest() if digest else f"{crc:08x}"
+        if actual != expected:
+            raise HTTPException(status_code=422, detail=f"Checksum mismatch for part {index}")
+
+        await run_in_threadpool(upload.mark_received, index, f"{algorithm}={actual}")
+        metrics.record_bytes("receive_upload", written)
+        reservation = scratch_space.jobs.get(upload_id)
+        if reservation:
+            await run_in_threadpool(reservation.refresh)
+        extractor = _extractors.get(upload_id)
+        if extractor:
+            extractor.progress.set()
+        received = await run_in_threadpool(upload.received_parts)
+        return {"upload_id": upload_id, "part": index, "received": len(received), "parts": upload.part_count}
+
+    @router.post("/uploads/{upload_id}/complete")
+    async def complete_upload(upload_id: str):
+        upload = await run_in_threadpool(UploadState, staging_root, upload_id)
+        missing = sorted(set(range(upload.part_count)) - set(await run_in_threadpool(upload.received_parts)))
+        if missing:
+            raise HTTPException(status_code=409, detail={"message": "Upload incomplete", "missing_parts": missing[:100]})
+
+        prepared_audio = None
+        extractor = _pop_extractor(upload_id)
+        if extractor:
+            extractor.progress.set()
+            with metrics.stage("early_extract_wait"):
+                await run_in_threadpool(extractor.join)
+            if extractor.ok:
+                prepared_audio = upload.audio_path
+
+        meta = upload.meta
+        try:
+            # Another upload of the same recording may have finished since this one started;
+            # don't move the new copy over the one that was processed
+            if find_existing:
+                existing = await run_in_threadpool(find_existing, meta["filename"], meta["meeting_id"], meta["user_id"])
+                if existing:
+                    return JSONResponse(content=existing)
+            async with scratch_space.async_job(f"{meta['meeting_id']}_{meta['user_id']}", scratch.estimate_job_bytes(upload.size),
+                                               replaces=upload_id) as job:
+                if destination:
+                    video_path = destination(meta["filename"])
+                    await run_in_threadpool(_move_into_place, upload.data_path, video_path)
+                else:
+                    video_path = job.track(upload.data_path)
+                if prepared_audio:
+                    job.track(prepared_audio)
+                result = await process(video_path, meta["meeting_id"], meta["user_id"], prepared_audio=prepared_audio)
+            return JSONResponse(content=result)
+        except scratch.InsufficientScratchSpace as e:
+            raise HTTPException(status_code=507, detail=str(e))
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception(f"[UPLOAD] {upload_id}: processing failed")
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            scratch_space.unreserve(upload_id)
+            await run_in_threadpool(shutil.rmtree, upload.dir, ignore_errors=True)
+
+    @router.delete("/uploads/{upload_id}")
+    async def abort_upload(upload_id: str):
+        upload = await run_in_threadpool(UploadState, staging_root, upload_id)
+        extractor = _pop_extractor(upload_id)
+        if extractor:
+            extractor.cancelled = True
+            extractor.progress.set()
+            await run_in_threadpool(extractor.join)
+        scratch_space.unreserve(upload_id)
+        await run_in_threadpool(shutil.rmtree, upload.dir, ignore_errors=True)
+        return {"upload_id": upload_id, "status": "aborted"}
+
+    return router
@@ -0,0 +1,327 @@
+# === Scratch Space Management (per-job intermediates, disk backpressure, orphan GC) ===
+#
+# Intermediates (uploads, compressed video, audio, FLAC chunks, captioned video) are
+# registered with the current job via track() and deleted with release() as soon as
+# the next stage has consumed them. Whatever is still registered when the job exits,
+# successfully or not, is removed. New jobs wait for (and are eventually refused)
+# disk space when the volume drops below SCRATCH_MIN_FREE_GB. Resumable uploads reserve
+# their space at init and hand the reservation to the job that processes them.
+
+import asyncio
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MIN_FREE_BYTES = int(float(os.getenv("SCRATCH_MIN_FREE_GB", "5")) * 1024 ** 3)
+ADMISSION_WAIT_SECONDS = float(os.getenv("SCRATCH_WAIT_SECONDS", "300"))
+ORPHAN_AGE_SECONDS = float(os.getenv("SCRATCH_ORPHAN_HOURS", "6")) * 3600
+# Peak intermediates (compressed/captioned video, WAV/MP3, FLAC chunks) relative to the input size
+INTERMEDIATE_FACTOR = float(os.getenv("SCRATCH_INTERMEDIATE_FACTOR", "2"))
+
+SCRATCH_BYTES = metrics.Gauge("video_pipeline_scratch_bytes", "Bytes of intermediates currently held by jobs.")
+SCRATCH_FREE_BYTES = metrics.Gauge("video_pipeline_scratch_free_bytes", "Free bytes on the scratch volume.")
+SCRATCH_REFUSED = metrics.Counter("video_pipeline_scratch_refused_total", "Jobs refused for lack of disk space.")
+metrics.REGISTRY.extend([SCRATCH_BYTES, SCRATCH_FREE_BYTES, SCRATCH_REFUSED])
+
+
+class InsufficientScratchSpace(Exception):
+    pass
+
+
+def estimate_job_bytes(input_bytes: int) -> int:
+    return int(input_bytes * INTERMEDIATE_FACTOR)
+
+
+class ScratchJob:
+    def __init__(self, space: "ScratchSpace", job_id: str, reserved_bytes: int):
+        self.space = space
+        self.job_id = job_id
+        self.reserved_bytes = reserved_bytes
+        self.files: Dict[str, int] = {}
+        self.peak_bytes = 0
+        self._dir: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def dir(self) -> str:
+        if self._dir is None:
+            safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", self.job_id)[:80]
+            self._dir = os.path.join(self.space.root, f"job_{safe_id}_{uuid.uuid4().hex[:8]}")
+            os.makedirs(self._dir, exist_ok=True)
+        return self._dir
+
+    @property
+    def bytes_used(self) -> int:
+        return sum(self.files.values())
+
+    def path(self, name: str) -> str:
+        return self.track(os.path.join(self.dir, os.path.basename(name)))
+
+    def track(self, path: str) -> str:
+        with self._lock:
+            self.files.setdefault(os.path.abspath(path), 0)
+        return path
+
+    def refresh(self):
+        with self._lock:
+            for path in self.files:
+                try:
+                    self.files[path] = _disk_bytes(path)
+                except OSError:
+                    self.files[path] = 0
+            self.peak_bytes = max(self.peak_bytes, self.bytes_used)
+        self.space.refresh_gauges()
+
+    def release(self, *paths: str):
+        self.refresh()
+        for path in paths:
+            key = os.path.abspath(path)
+            with self._lock:
+                if key not in self.files:
+                    continue
+                del self.files[key]
+            _remove(key)
+        self.space.notify()
+
+    def cleanup(self):
+        self.release(*list(self.files))
+        if self._dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+
+class ScratchSpace:
+    def __init__(self, root: str, extra_dirs: Iterable[str] = (), min_free_bytes: int = MIN_FREE_BYTES,
+                 wait_seconds: float = ADMISSION_WAIT_SECONDS, orphan_age_seconds: float = ORPHAN_AGE_SECONDS):
+        self.root = root
+        self.extra_dirs = list(extra_dirs)
+        self.min_free_bytes = min_free_bytes
+        self.wait_seconds = wait_seconds
+        self.orphan_age_seconds = orphan_age_seconds
+        self.jobs: Dict[str, ScratchJob] = {}
+        self._reservations = set()
+        self._cond = threading.Condition()
+        self._root_ready = False
+
+    def free_bytes(self) -> int:
+        # The root is created on first use rather than at import, since it may be on a network share
+        if not self._root_ready:
+            os.makedirs(self.root, exist_ok=True)
+            self._root_ready = True
+        return shutil.disk_usage(self.root).free
+
+    def outstanding_bytes(self) -> int:
+        # Space admitted jobs are still expected to consume on top of what they already hold
+        return sum(max(0, job.reserved_bytes - job.bytes_used) for job in list(self.jobs.values()))
+
+    def available_bytes(self) -> int:
+        return self.free_bytes() - self.outstanding_bytes() - self.min_free_bytes
+
+    def refresh_gauges(self):
+        SCRATCH_BYTES.set(sum(job.bytes_used for job in list(self.jobs.values())))
+        SCRATCH_FREE_BYTES.set(self.free_bytes())
+
+    def notify(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def ensure_capacity(self, expected_bytes: int) -> None:
+        if self.available_bytes() < expected_bytes:
+            SCRATCH_REFUSED.inc()
+            raise InsufficientScratchSpace(
+                f"Not enough scratch space: need {expected_bytes} bytes, "
+                f"{max(self.available_bytes(), 0)} available above the {self.min_free_bytes}-byte reserve"
+            )
+
+    def admit(self, key: str, job: ScratchJob, wait: bool = True, replaces: Optional[str] = None) -> None:
+        """Register ``job`` under ``key`` once its reservation fits. The check and the
+        registration happen under one lock, so two jobs can't both claim the same free
+        space. ``replaces`` hands over a reservation (see reserve()) in the same step."""
+        deadline = time.monotonic() + (self.wait_seconds if wait else 0)
+        with self._cond:
+            self._prune_reservations()
+            while self.available_bytes() + self._outstanding(replaces) < job.reserved_bytes:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.jobs:
+                    # Nothing in flight will free space for us, or we've waited long enough
+                    self.ensure_capacity(job.reserved_bytes - self._outstanding(replaces))
+                    break
+                logger.info(f"[SCRATCH] Waiting for disk space ({job.reserved_bytes} bytes needed)")
+                self._cond.wait(timeout=min(remaining, 5.0))
+            if replaces:
+                self.jobs.pop(replaces, None)
+                self._reservations.discard(replaces)
+            self.jobs[key] = job
+
+    def reserve(self, key: str, job_id: str, expected_bytes: int, directory: str, *paths: str) -> ScratchJob:
+        """Hold ``expected_bytes`` for work that spans several requests (a resumable upload),
+        or refuse at once. ``paths`` count against the reservation as they fill. Release it
+        with unreserve(), or hand it to the job that consumes it with ``replaces=``."""
+        job = ScratchJob(self, job_id, expected_bytes)
+        job._dir = directory
+        for path in paths:
+            job.track(path)
+        self.admit(key, job, wait=False)
+        with self._cond:
+            self._reservations.add(key)
+        return job
+
+    def unreserve(self, key: str) -> None:
+        with self._cond:
+            self.jobs.pop(key, None)
+            self._reservations.discard(key)
+            self._cond.notify_all()
+
+    def _outstanding(self, key: Optional[str]) -> int:
+        job = self.jobs.get(key) if key else None
+        return max(0, job.reserved_bytes - job.bytes_used) if job else 0
+
+    def _prune_reservations(self):
+        # Another worker process may have completed, aborted or collected the upload
+        for key in [k for k in self._reservations if not os.path.isdir(self.jobs[k]._dir)]:
+            self.jobs.pop(key, None)
+            self._reservations.discard(key)
+
+    @contextmanager
+    def job(self, job_id: str, expected_bytes: int = 0):
+        """Scratch context for one job. Nested calls join the enclosing job."""
+        existing = _current_job.get()
+        if existing is not None:
+            existing.reserved_bytes = max(existing.reserved_bytes, expected_bytes)
+            yield existing
+            return
+
+        job = ScratchJob(self, job_id, expected_bytes)
+        key = uuid.uuid4().hex
+        self.admit(key, job)
+        with self._hold(key, job):
+            yield job
+
+    @asynccontextmanager
+    async def async_job(self, job_id: str, expected_bytes: int = 0, replaces: Optional[str] = None):
+        """job() for async routes: waiting for disk space happens in a worker thread,
+        so the event loop keeps serving other requests meanwhile."""
+        if _current_job.get() is not None:
+            with self.job(job_id, expected_bytes) as job:
+                yield job
+            return
+
+        job = ScratchJob(self, job_id, expected_bytes)
+        key = uuid.uuid4().hex
+        admission = asyncio.get_running_loop().run_in_executor(None, self.admit, key, job, True, replaces)
+        try:
+            await asyncio.shield(admission)
+        except asyncio.CancelledError:
+            # The admission thread carries on; drop the job if it still gets in
+            admission.add_done_callback(lambda _: self.unreserve(key))
+            raise
+        with self._hold(key, job):
+            yield job
+
+    @contextmanager
+    def _hold(self, key: str, job: ScratchJob):
+        token = _current_job.set(job)
+        try:
+            yield job
+        finally:
+            _current_job.reset(token)
+            job.cleanup()
+            with self._cond:
+                self.jobs.pop(key, None)
+                self._cond.notify_all()
+            self.refresh_gauges()
+            logger.info(f"[SCRATCH] {job.job_id}: peak {job.peak_bytes} bytes of intermediates")
+
+    def collect_orphans(self) -> int:
+        """Remove leftovers from crashed or killed jobs. Entries modified within the orphan
+        age (for folders, anything inside them) are kept, since another worker process may
+        still be using them: a resumable upload or live session that is still receiving."""
+        cutoff = time.time() - self.orphan_age_seconds
+        active = {job._dir for job in list(self.jobs.values()) if job._dir}
+        removed = 0
+        for directory in [self.root] + self.extra_dirs:
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.path in active:
+                    continue
+                try:
+                    if _last_modified(entry) > cutoff:
+                        continue
+                    if entry.is_dir():
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    else:
+                        os.remove(entry.path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"[SCRATCH] Could not remove orphan {entry.path}: {e}")
+        if removed:
+            logger.info(f"[SCRATCH] Removed {removed} orphaned scratch entries")
+        return removed
+
+
+_current_job: ContextVar[Optional[ScratchJob]] = ContextVar("scratch_job", default=None)
+
+
+def current_job() -> Optional[ScratchJob]:
+    return _current_job.get()
+
+
+def track(path: str) -> str:
+    job = current_job()
+    if job:
+        job.track(path)
+    return path
+
+
+def release(*paths: str):
+    """Delete intermediates the current job owns; untracked paths are left alone."""
+    job = current_job()
+    if job:
+        job.release(*paths)
+
+
+def refresh():
+    job = current_job()
+    if job:
+        job.refresh()
+
+
+def _last_modified(entry: os.DirEntry) -> float:
+    # A folder's own mtime only changes when entries are added or removed, not when files in it are written
+    newest = entry.stat().st_mtime
+    if entry.is_dir(follow_symlinks=False):
+        for root, dirs, files in os.walk(entry.path):
+            for name in dirs + files:
+                try:
+                    newest = max(newest, os.stat(os.path.join(root, name), follow_symlinks=False).st_mtime)
+                except OSError:
+                    pass
+    return newest
+
+
+def _disk_bytes(path: str) -> int:
+    # Allocated rather than apparent size, so a preallocated upload counts as its parts land
+    st = os.stat(path)
+    return st.st_blocks * 512 if hasattr(st, "st_blocks") else st.st_size
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"[SCRATCH] Could not remove {path}: {e}")
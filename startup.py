@@ -0,0 +1,238 @@
+# === Fast Startup: lazy imports / clients and background warm-up ===
+#
+# main.py and app.py import nothing heavy and connect to nothing at import time.
+# SDK modules and clients (openai, pymongo, pyodbc, python-docx, graphviz, fpdf, the
+# Azure SDK, duckduckgo_search, bs4) are wrapped in Lazy objects that build the real
+# thing on first use; anything can be swapped for a stand-in with Lazy.set(). Work
+# that touches the network or the SMB share (creating folders, orphan cleanup, SQL
+# schema check, preloading clients) runs as Warmup steps in a background thread, so
+# a worker answers /health straight away and reports "starting" until warm-up ends.
+#
+# Startup profile mode:
+#   python startup.py main                  # import time, slowest imports, heavy modules loaded at import
+#   python startup.py app --clients         # ... plus time to load each lazy client
+#   python startup.py main --warmup --output startup.json
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMPORTED_AT = time.perf_counter()
+
+# Modules that must not be imported while main/app are being imported
+HEAVY_MODULES = (
+    "openai", "pymongo", "pyodbc", "docx", "graphviz", "fpdf", "azure.storage.blob",
+    "duckduckgo_search", "bs4", "requests", "uvicorn",
+)
+
+LAZY: List["Lazy"] = []
+
+
+class Lazy:
+    """A module, class or client that is only imported/constructed on first use.
+
+    Attribute access and calls are forwarded to the real object, so
+    ``openai.Audio.transcribe(...)`` or ``Document()`` work unchanged. Attributes the
+    proxy has itself (``get``, ``set``, ``reset``, ``name``) are not forwarded, so wrap
+    the function rather than the module in that case: ``lazy_import("requests", "get")``.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], object]):
+        self.name = name
+        self.factory = factory
+        self.init_seconds: Optional[float] = None
+        self._value = None
+        self._ready = False
+        self._lock = threading.Lock()
+        LAZY.append(self)
+
+    @property
+    def initialized(self) -> bool:
+        return self._ready
+
+    def get(self):
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    start = time.perf_counter()
+                    self._value = self.factory()
+                    self.init_seconds = time.perf_counter() - start
+                    self._ready = True
+                    logger.info(f"[STARTUP] Loaded {self.name} in {self.init_seconds * 1000:.0f} ms")
+        return self._value
+
+    def set(self, value) -> None:
+        """Inject an already-built object (a stand-in, or a client configured elsewhere)."""
+        with self._lock:
+            self._value = value
+            self.init_seconds = 0.0
+            self._ready = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._value = None
+            self.init_seconds = None
+            self._ready = False
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<Lazy {self.name} ({'loaded' if self._ready else 'not loaded'})>"
+
+
+def lazy_import(module: str, attr: Optional[str] = None) -> Lazy:
+    """``lazy_import("docx", "Document")`` stands in for ``from docx import Document``."""
+    def load():
+        loaded = importlib.import_module(module)
+        return getattr(loaded, attr) if attr else loaded
+    return Lazy(f"{module}.{attr}" if attr else module, load)
+
+
+def preload(lazies: Optional[List[Lazy]] = None) -> None:
+    """Load every lazy module/client now, so the first request doesn't pay for it."""
+    failed = []
+    for lazy in LAZY if lazies is None else lazies:
+        try:
+            lazy.get()
+        except Exception as e:
+            logger.warning(f"[STARTUP] Could not load {lazy.name}: {e}")
+            failed.append(lazy.name)
+    if failed:
+        raise RuntimeError(f"Could not load: {', '.join(failed)}")
+
+
+class Warmup:
+    """Startup steps run once, in order, off the request path. A failing step is
+    logged and recorded; the remaining steps still run."""
+
+    def __init__(self):
+        self.steps: List[Tuple[str, Callable[[], object]]] = []
+        self.results: Dict[str, dict] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, name: str, fn: Callable[[], object]) -> None:
+        self.steps.append((name, fn))
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None
+
+    def run(self) -> dict:
+        self.started_at = time.perf_counter()
+        for name, fn in self.steps:
+            start = time.perf_counter()
+            try:
+                fn()
+                self.results[name] = {"ok": True}
+            except Exception as e:
+                logger.error(f"[STARTUP] {name} failed: {e}")
+                self.results[name] = {"ok": False, "error": str(e)}
+            self.results[name]["seconds"] = round(time.perf_counter() - start, 3)
+        self.finished_at = time.perf_counter()
+        logger.info(f"[STARTUP] Warm-up finished in {self.finished_at - self.started_at:.2f}s: {self.results}")
+        return self.report()
+
+    def start(self) -> "Warmup":
+        if self._thread is None:
+            logger.info(f"[STARTUP] Serving {time.perf_counter() - IMPORTED_AT:.2f}s after import; warming up in the background")
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def report(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "warmup_s": round((self.finished_at or time.perf_counter()) - self.started_at, 3) if self.started_at else None,
+            "steps": dict(self.results),
+        }
+
+
+# === Startup profile mode ===
+def profile_imports(module: str) -> dict:
+    """Import ``module`` in a fresh interpreter under ``-X importtime``."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"import {module} failed")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level
+        entries.append((name[1:].rstrip(), int(cumulative_us)))
+    total = next((cumulative for name, cumulative in entries if name == module), None)
+    # Direct imports of the app module (and of anything imported before it, e.g. site)
+    direct = [(name.strip(), cumulative) for name, cumulative in entries
+              if name.startswith("  ") and not name.startswith("    ")]
+    loaded = {name.strip() for name, _ in entries}
+    return {
+        "module": module,
+        "interpreter_wall_s": round(wall, 3),
+        "import_s": round(total / 1e6, 3) if total is not None else None,
+        "slowest_imports": [
+            {"module": name, "s": round(cumulative / 1e6, 3)}
+            for name, cumulative in sorted(direct, key=lambda item: -item[1])[:15]
+        ],
+        "heavy_modules_at_import": sorted(m for m in HEAVY_MODULES if m in loaded),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Profile cold start of the video processing API.")
+    parser.add_argument("app", nargs="?", default="main", help="Module to profile (main or app).")
+    parser.add_argument("--clients", action="store_true", help="Also time loading every lazy module/client.")
+    parser.add_argument("--warmup", action="store_true", help="Also run the warm-up steps (touches storage, SQL, ...).")
+    parser.add_argument("--output", help="Write the profile as JSON to this path.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    report = profile_imports(args.app)
+    start = time.perf_counter()
+    module = importlib.import_module(args.app)
+    report["in_process_import_s"] = round(time.perf_counter() - start, 3)
+
+    if args.clients:
+        # The clients the app's profile uses; otherwise everything registered. Run as a
+        # script this file is __main__, so the registry is on the imported module
+        app_state = getattr(getattr(module, "app", None), "state", None)
+        lazies = getattr(app_state, "clients", None) or importlib.import_module("startup").LAZY
+        clients = {}
+        for lazy in lazies:
+            try:
+                lazy.get()
+                clients[lazy.name] = {"ok": True, "s": round(lazy.init_seconds, 3)}
+            except Exception as e:
+                clients[lazy.name] = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        report["lazy_clients"] = clients
+    if args.warmup:
+        report["warmup"] = module.app.state.warmup.run()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
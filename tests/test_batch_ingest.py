@@ -0,0 +1,29 @@
+import batch_ingest
+
+
+class Collection:
+    def __init__(self, processed=()):
+        self.processed = set(processed)
+
+    def find(self, query, projection=None):
+        return [{"video_path": p} for p in query["video_path"]["$in"] if p in self.processed]
+
+
+def test_batch_skips_processed_active_and_partial_recordings(tmp_path):
+    for name in ("done.mp4", "active.mp4", "new.mp4", "upload.mp4.part"):
+        (tmp_path / name).write_bytes(b"video")
+    processed = []
+
+    async def process(path, meeting_id, user_id):
+        processed.append(meeting_id)
+        return {"status": "success"}
+
+    batch = batch_ingest.BatchIngest(
+        str(tmp_path), process, Collection([str(tmp_path / "done.mp4")]),
+        is_active=lambda path: path.endswith("active.mp4"),
+    )
+    report = batch.run()
+
+    assert processed == ["new"]
+    assert report["skipped_already_processed"] == 1
+    assert report["skipped_in_progress"] == 1
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+import metrics
+import openai_scheduler
+
+
+@pytest.fixture(autouse=True)
+def scheduler_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(openai_scheduler, "STATE_PATH", str(tmp_path / "scheduler.sqlite3"))
+    monkeypatch.setattr(openai_scheduler._local, "conn", None, raising=False)
+
+
+def test_call_forwards_model_keyword_to_the_sdk():
+    def create(**kwargs):
+        return {"kwargs": kwargs}
+
+    response = openai_scheduler.call("gpt-4o", create, model="gpt-4o", messages=[], estimated_tokens=10)
+
+    assert response == {"kwargs": {"model": "gpt-4o", "messages": []}}
+
+
+def test_call_retries_rate_limits_with_model_keyword(monkeypatch):
+    monkeypatch.setattr(openai_scheduler, "_cooldown", lambda model, seconds: None)
+    attempts = []
+
+    class RateLimitError(Exception):
+        pass
+
+    def transcribe(model, file, response_format):
+        attempts.append(model)
+        if len(attempts) == 1:
+            raise RateLimitError("Rate limit reached")
+        return "text"
+
+    assert openai_scheduler.call("whisper-1", transcribe, model="whisper-1", file=None, response_format="text") == "text"
+    assert attempts == ["whisper-1", "whisper-1"]
+
+
+def test_call_stage_times_only_the_sdk_call(monkeypatch):
+    monkeypatch.setattr(openai_scheduler, "wait_for_slot", lambda model, estimated_tokens: time.sleep(0.2))
+
+    with metrics.track_job("job") as job:
+        openai_scheduler.call("gpt-4o", lambda **kwargs: {}, model="gpt-4o", stage="summarize")
+
+    assert job.stages["summarize"] < 0.1
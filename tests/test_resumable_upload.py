@@ -0,0 +1,100 @@
+import hashlib
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import resumable_upload
+import scratch
+
+MB = 1024 * 1024
+PAYLOAD = os.urandom(2 * MB + 12345)
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    processed = {}
+
+    async def process(video_path, meeting_id, user_id, prepared_audio=None):
+        with open(video_path, "rb") as f:
+            processed["data"] = f.read()
+        return {"status": "success"}
+
+    space = scratch.ScratchSpace(str(tmp_path / "scratch"), min_free_bytes=0)
+    app = FastAPI()
+    app.include_router(resumable_upload.create_router(str(tmp_path / "staging"), space, process))
+    client = TestClient(app)
+    client.processed = processed
+    client.space = space
+    return client
+
+
+def start(client, size=len(PAYLOAD)):
+    response = client.post("/uploads/", data={"filename": "v.mp4", "size": size, "meeting_id": "m", "user_id": "u",
+                                              "part_size": MB})
+    assert response.status_code == 200
+    return response.json()
+
+
+def put(client, info, index, body=None, offset=None, checksum=None):
+    start_byte = index * info["part_size"]
+    body = PAYLOAD[start_byte:start_byte + info["part_size"]] if body is None else body
+    headers = {
+        "X-Part-Offset": str(start_byte if offset is None else offset),
+        "X-Part-Checksum": checksum or "sha256=" + hashlib.sha256(body).hexdigest(),
+    }
+    return client.put(f"/uploads/{info['upload_id']}/parts/{index}", content=body, headers=headers)
+
+
+def test_parts_assemble_in_any_order(uploads):
+    info = start(uploads)
+    assert info["parts"] == 3
+    for index in (2, 0, 1):
+        assert put(uploads, info, index).status_code == 200
+
+    response = uploads.post(f"/uploads/{info['upload_id']}/complete")
+
+    assert response.status_code == 200
+    assert uploads.processed["data"] == PAYLOAD
+    assert not uploads.space.jobs
+
+
+def test_complete_reports_missing_parts(uploads):
+    info = start(uploads)
+    put(uploads, info, 1)
+
+    response = uploads.post(f"/uploads/{info['upload_id']}/complete")
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["missing_parts"] == [0, 2]
+
+
+def test_part_at_wrong_offset_is_rejected(uploads):
+    info = start(uploads)
+
+    assert put(uploads, info, 1, offset=0).status_code == 400
+
+
+@pytest.mark.parametrize("body", [PAYLOAD[:MB + 1], PAYLOAD[:MB - 1]])
+def test_part_of_wrong_size_is_rejected(uploads, body):
+    info = start(uploads)
+
+    assert put(uploads, info, 0, body=body).status_code == 400
+    assert uploads.get(f"/uploads/{info['upload_id']}").json()["received"] == []
+
+
+@pytest.mark.parametrize("checksum", ["sha256=" + "0" * 64, "crc32=00000000"])
+def test_part_with_bad_checksum_is_rejected(uploads, checksum):
+    info = start(uploads)
+
+    assert put(uploads, info, 0, checksum=checksum).status_code == 422
+    assert uploads.get(f"/uploads/{info['upload_id']}").json()["received"] == []
+
+
+def test_abort_releases_the_reservation(uploads):
+    info = start(uploads)
+    assert info["upload_id"] in uploads.space.jobs
+
+    assert uploads.delete(f"/uploads/{info['upload_id']}").status_code == 200
+    assert not uploads.space.jobs
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import shutil
+import threading
+
+import pytest
+
+import scratch
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def space(tmp_path):
+    # About 100 MB above the reserve, whatever the disk actually has free
+    free = shutil.disk_usage(tmp_path).free
+    return scratch.ScratchSpace(str(tmp_path / "scratch"), min_free_bytes=free - 100 * MB, wait_seconds=0)
+
+
+def test_concurrent_jobs_cannot_claim_the_same_space(space):
+    admitted, refused = [], []
+    barrier = threading.Barrier(4)
+    release = threading.Event()
+
+    def run():
+        barrier.wait()
+        try:
+            with space.job("job", 60 * MB):
+                admitted.append(1)
+                release.wait(5)
+        except scratch.InsufficientScratchSpace:
+            refused.append(1)
+            release.set()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(admitted) == 1 and len(refused) == 3
+
+
+def test_reservation_is_held_until_released(space, tmp_path):
+    upload_dir = tmp_path / "upload"
+    upload_dir.mkdir()
+    space.reserve("upload", "upload", 80 * MB, str(upload_dir))
+
+    with pytest.raises(scratch.InsufficientScratchSpace):
+        space.reserve("other", "other", 80 * MB, str(upload_dir))
+    space.unreserve("upload")
+    space.reserve("other", "other", 80 * MB, str(upload_dir))
+
+
+def test_reservation_is_handed_to_the_processing_job(space, tmp_path):
+    upload_dir = tmp_path / "upload"
+    upload_dir.mkdir()
+    space.reserve("upload", "upload", 80 * MB, str(upload_dir))
+
+    async def process():
+        async with space.async_job("job", 60 * MB, replaces="upload"):
+            assert "upload" not in space.jobs
+            with pytest.raises(scratch.InsufficientScratchSpace):
+                space.reserve("other", "other", 60 * MB, str(upload_dir))
+
+    asyncio.run(process())
+    assert not space.jobs
+
+
+def test_reservations_of_removed_uploads_are_dropped(space, tmp_path):
+    upload_dir = tmp_path / "upload"
+    upload_dir.mkdir()
+    space.reserve("upload", "upload", 80 * MB, str(upload_dir))
+    upload_dir.rmdir()
+
+    with space.job("job", 80 * MB):
+        pass
+
+
+def test_orphan_collection_keeps_folders_with_recent_writes(space, tmp_path):
+    root = tmp_path / "scratch"
+    active = root / "active"
+    stale = root / "stale"
+    for folder in (active, stale):
+        (folder / "parts").mkdir(parents=True)
+        (folder / "parts" / "000000").write_text("sha256=00")
+        os.utime(folder / "parts" / "000000", (0, 0))
+        os.utime(folder / "parts", (0, 0))
+        os.utime(folder, (0, 0))
+    (active / "data").write_bytes(b"part")
+    os.utime(active, (0, 0))
+    space.orphan_age_seconds = 60
+
+    assert space.collect_orphans() == 1
+    assert active.exists() and not stale.exists()
@@ -0,0 +1,39 @@
+import pytest
+
+import pipeline
+import startup
+
+
+@pytest.fixture
+def http_get():
+    yield pipeline.http_get
+    pipeline.http_get.reset()
+
+
+def test_lazy_http_get_forwards_arguments(http_get):
+    calls = []
+    http_get.set(lambda url, timeout=None: calls.append((url, timeout)) or "page")
+
+    assert pipeline.http_get("https://example.invalid", timeout=10) == "page"
+    assert calls == [("https://example.invalid", 10)]
+
+
+def test_preload_reports_every_failure():
+    ok = startup.Lazy("ok", lambda: 1)
+    broken = startup.Lazy("broken", lambda: 1 / 0)
+
+    with pytest.raises(RuntimeError, match="broken"):
+        startup.preload([broken, ok])
+    assert ok.initialized
+
+
+@pytest.mark.parametrize("profile, used, unused", [
+    ("smb", [pipeline.Document, pipeline.DDGS, pipeline.mongo_client], [pipeline.blob_service_client, pipeline.FPDF]),
+    ("azure", [pipeline.FPDF, pipeline.blob_service_client], [pipeline.Document, pipeline.DDGS]),
+])
+def test_pipeline_clients_follow_profile(tmp_path, profile, used, unused):
+    core = pipeline.Pipeline(pipeline.Settings(profile, scratch_root=str(tmp_path)))
+    clients = core.clients()
+
+    assert all(any(c is lazy for c in clients) for lazy in used)
+    assert not any(any(c is lazy for c in clients) for lazy in unused)